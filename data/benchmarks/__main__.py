@@ -0,0 +1,296 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import importlib
+import tempfile
+import contextlib
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from synthetic import generate_corpus
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Stages import the pipeline's scripts the way they import each other
+for directory in ["data_collection", "data_cleanup", "doc-retrieval"]:
+    sys.path.insert(1, os.path.join(DATA_DIR, directory))
+
+from benchmark import peak_rss_mb, resource  # noqa: E402
+
+RESULTS_DIR = "./results"
+
+
+def tree_size(directory: str, extension: str):
+    """Number and total bytes of the files with `extension` under `directory`."""
+    count = size = 0
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith(extension):
+                count += 1
+                size += os.path.getsize(os.path.join(root, file))
+    return count, size
+
+
+def extract_pdfs(workdir: str, workers: int):
+    """pdf_extract.py: copy each downloaded PDF to ../aws/pdfs under its document ID."""
+    import pdf_extract
+
+    os.chdir(os.path.join(workdir, "data_collection"))
+    pdf_extract.process_directory()
+    return tree_size(pdf_extract.INPUT_DIR, ".pdf")
+
+
+def clean(workdir: str, workers: int, force: bool = True):
+    """data_cleanup: parse every converted bill into JSON, then write the corpus."""
+    from cleaning import INPUT_DIR, run_cleanup
+
+    os.chdir(os.path.join(workdir, "data_cleanup"))
+    run_cleanup(workers=workers, force=force)
+    return tree_size(INPUT_DIR, ".md")
+
+
+def clean_unchanged(workdir: str, workers: int):
+    """data_cleanup again, with nothing changed since the last run."""
+    return clean(workdir, workers, force=False)
+
+
+def prepare(workdir: str, workers: int):
+    """Indexing preparation: load, hash, chunk and build the documents of every bill."""
+    from index_manifest import IndexManifest
+    from indexing import iter_bill_files, prepare_changed_bills
+
+    input_dir = os.path.join(workdir, "data_cleanup", "cleaned_json")
+    manifest = IndexManifest(os.path.join(workdir, "index_manifest.json"))
+    bills = sum(
+        1
+        for _ in prepare_changed_bills(
+            iter_bill_files(input_dir),
+            manifest,
+            set(),
+            force=True,
+            workers=workers,
+            input_dir=input_dir,
+        )
+    )
+    return bills, tree_size(input_dir, ".json")[1]
+
+
+# Name -> (function running the stage, what it counts, modules it imports),
+# in pipeline order; later stages read what earlier ones wrote
+STAGES = {
+    "pdf_extract": (extract_pdfs, "files", ["pdf_extract"]),
+    "cleanup": (clean, "files", ["cleaning"]),
+    "cleanup_unchanged": (clean_unchanged, "files", ["cleaning"]),
+    "prepare": (prepare, "bills", ["indexing"]),
+}
+
+
+def workers_peak_rss_mb():
+    """
+    Largest peak RSS among the worker processes this process has waited
+    for, or None if it started none. On Linux a worker's peak also counts
+    what it inherited from this process before exec, so this is an upper
+    bound.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if not peak:
+        return None
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_stage(name: str, workdir: str, workers: int) -> dict:
+    """Run one stage, returning its time, how much it read and its peak memory."""
+    func, _, modules = STAGES[name]
+    # Import time is not the stage's
+    for module in modules:
+        importlib.import_module(module)
+    baseline = peak_rss_mb()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        items, size = func(workdir, workers)
+        seconds = time.perf_counter() - started
+    return {
+        "seconds": seconds,
+        "items": items,
+        "bytes": size,
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline,
+        "workers_peak_rss_mb": workers_peak_rss_mb(),
+    }
+
+
+def measure(name: str, workdir: str, workers: int) -> dict:
+    """run_stage in a fresh process, so peak memory is its own."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        try:
+            return executor.submit(run_stage, name, workdir, workers).result()
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+
+def run_benchmarks(workdir: str, stages, workers: int, repeat: int) -> dict:
+    """
+    Run the stages in order `repeat` times over the corpus in `workdir`,
+    keeping each stage's best time and its highest peak memory.
+    """
+    runs = {name: [] for name in stages}
+    for _ in range(repeat):
+        for name in stages:
+            runs[name].append(measure(name, workdir, workers))
+
+    results = {}
+    for name, stage_runs in runs.items():
+        succeeded = [run for run in stage_runs if "error" not in run]
+        if not succeeded:
+            results[name] = stage_runs[0]
+            continue
+        result = dict(min(succeeded, key=lambda run: run["seconds"]))
+        for key in ["peak_rss_mb", "workers_peak_rss_mb"]:
+            peaks = [run[key] for run in succeeded if run[key] is not None]
+            result[key] = max(peaks) if peaks else None
+        results[name] = result
+
+    for name, result in results.items():
+        if "error" not in result:
+            seconds = max(result["seconds"], 1e-9)
+            result["unit"] = STAGES[name][1]
+            result["items_per_second"] = result["items"] / seconds
+            result["mb_per_second"] = result["bytes"] / seconds / 1_000_000
+    return results
+
+
+def git_commit():
+    try:
+        process = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=DATA_DIR,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return process.stdout.strip() if process.returncode == 0 else None
+
+
+def print_results(results: dict):
+    for name, result in results["stages"].items():
+        if "error" in result:
+            print(f"{name:>17}: failed, {result['error']}")
+            continue
+        line = (
+            f"{name:>17}: {result['seconds']:.3f}s, "
+            f"{result['items_per_second']:,.0f} {result['unit']}/s, "
+            f"{result['mb_per_second']:.1f} MB/s"
+        )
+        if result["peak_rss_mb"] is not None:
+            line += (
+                f", peak RSS {result['peak_rss_mb']:.1f} MB "
+                f"(+{result['peak_rss_mb'] - result['baseline_rss_mb']:.1f} MB)"
+            )
+        if result["workers_peak_rss_mb"] is not None:
+            line += f", workers up to {result['workers_peak_rss_mb']:.1f} MB"
+        print(line)
+
+
+def print_comparison(previous: dict, results: dict):
+    """Each stage's time against an earlier run's."""
+    if previous.get("corpus", {}).get("config") != results["corpus"]["config"]:
+        print("Note: the earlier run used a different corpus")
+    print(f"Compared with {previous.get('commit')} ({previous.get('started')}):")
+    for name, result in results["stages"].items():
+        before = previous.get("stages", {}).get(name)
+        if before is None or "error" in before or "error" in result:
+            continue
+        print(
+            f"{name:>17}: {before['seconds']:.3f}s -> {result['seconds']:.3f}s "
+            f"({before['seconds'] / max(result['seconds'], 1e-9):.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time each stage of the data pipeline on a synthetic corpus."
+    )
+    parser.add_argument("--bills", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--image-rate", type=float, default=0.1)
+    parser.add_argument("--image-size", type=int, default=200_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument(
+        "--stages", nargs="+", choices=list(STAGES), default=list(STAGES)
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="Results file (default: results/<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare with")
+    parser.add_argument(
+        "--workdir", help="Where to generate the corpus (default: a temp dir)"
+    )
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpus")
+    args = parser.parse_args()
+    if args.workdir and os.path.isdir(args.workdir) and os.listdir(args.workdir):
+        parser.error(f"{args.workdir} is not empty")
+
+    started = datetime.now(timezone.utc)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="pipeline-benchmark-")
+    config = {
+        "bills": args.bills,
+        "seed": args.seed,
+        "image_rate": args.image_rate,
+        "image_size": args.image_size,
+        "duplicate_rate": args.duplicate_rate,
+    }
+    try:
+        generated = time.perf_counter()
+        corpus = generate_corpus(
+            os.path.join(workdir, "data_cleanup", "converted_docs"),
+            os.path.join(workdir, "data_collection", "downloaded_docs"),
+            **config,
+        )
+        generated = time.perf_counter() - generated
+        print(
+            f"Generated {corpus['files']} files for {corpus['bills']} bills "
+            f"({corpus['markdown_bytes'] / 1_000_000:.1f} MB of markdown) "
+            f"in {generated:.1f}s"
+        )
+
+        # Stages run in pipeline order whatever order they were given in
+        stages = [name for name in STAGES if name in args.stages]
+        results = {
+            "started": started.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "workers": args.workers,
+            "repeat": args.repeat,
+            "corpus": {"config": config, **corpus, "seconds": generated},
+            "stages": run_benchmarks(workdir, stages, args.workers, args.repeat),
+        }
+    finally:
+        if args.keep or args.workdir:
+            print(f"Corpus kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{started.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {output}")
+
+    sys.exit(1 if any("error" in r for r in results["stages"].values()) else 0)
@@ -0,0 +1,306 @@
+import os
+import random
+import base64
+import argparse
+from datetime import date, timedelta
+from typing import Dict, List
+
+# Prefixes used for bill IDs, as in doc-retrieval's BILL_TYPE_MAP
+BILL_TYPES = ["SB", "R", "FB", "GB", "AB", "BB", "SR-A"]
+# Final version of a bill -> the result recorded on it
+OUTCOMES = {"OFFICIATED": "Passed", "VETOED": "Vetoed", "FAILED": "Failed"}
+SESSION_START = date(2024, 8, 21)
+
+FIRST_NAMES = [
+    "Avery",
+    "Jordan",
+    "Priya",
+    "Marcus",
+    "Elena",
+    "Sam",
+    "Wei",
+    "Fatima",
+    "Diego",
+    "Hannah",
+    "Kwame",
+    "Olivia",
+    "Rohan",
+    "Grace",
+    "Tyler",
+    "Mei",
+]
+LAST_NAMES = [
+    "Patel",
+    "Nguyen",
+    "Johnson",
+    "Okafor",
+    "Garcia",
+    "Smith",
+    "Chen",
+    "Brooks",
+    "Ramirez",
+    "Kim",
+    "Walker",
+    "Singh",
+    "Lopez",
+    "Bennett",
+    "Hughes",
+    "Park",
+]
+SUBJECTS = [
+    "student fees",
+    "dining services",
+    "campus transit",
+    "library hours",
+    "mental health resources",
+    "sustainability initiatives",
+    "parking",
+    "student organization funding",
+    "housing conditions",
+    "textbook costs",
+    "campus safety",
+    "accessibility services",
+    "athletics ticketing",
+]
+BODIES = [
+    "the Student Senate",
+    "the Student Body",
+    "the University Administration",
+    "the Department of Transportation",
+    "University Housing",
+    "the Appropriations Committee",
+]
+PHRASES = [
+    "has a responsibility to represent the interests of all students",
+    "recognizes that {subject} directly affect student success",
+    "received numerous concerns regarding {subject} this semester",
+    "finds that current policies on {subject} are insufficient",
+    "allocated funds from the Student Activity Fee for this purpose",
+    "consulted with {body} on the proposed changes",
+    "believes that transparency in {subject} benefits the campus community",
+    "shall be funded in the amount of ${amount} from the general reserve",
+]
+# One-pixel PNG, the start of every embedded image
+PNG_HEADER = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4nGNgYGBgAAAABQABpfZFQAAAAABJRU5ErkJggg=="
+)
+
+
+def _sentence(rng: random.Random) -> str:
+    return rng.choice(PHRASES).format(
+        subject=rng.choice(SUBJECTS),
+        body=rng.choice(BODIES),
+        amount=f"{rng.randint(1, 200) * 50:,}",
+    )
+
+
+def _names(rng: random.Random, count: int) -> str:
+    return ", ".join(
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(count)
+    )
+
+
+def _date(week: int) -> str:
+    day = SESSION_START + timedelta(weeks=week)
+    return f"{day.month}/{day.day}/{day.year}"
+
+
+def _image(rng: random.Random, size: int) -> str:
+    """Inline base64 PNG as markitdown embeds scanned pages, about `size` bytes."""
+    data = PNG_HEADER + rng.randbytes(max(0, size * 3 // 4 - len(PNG_HEADER)))
+    return f"![](data:image/png;base64,{base64.b64encode(data).decode('ascii')})"
+
+
+def bill_markdown(
+    rng: random.Random,
+    bill_id: str,
+    stage: int,
+    week: int = 0,
+    outcome: str = None,
+    images: int = 0,
+    image_size: int = 0,
+    empty: bool = False,
+) -> str:
+    """
+    Markdown for one version of a bill, laid out like markitdown's output
+    for the real documents: a bold long title on the third line, bold
+    metadata lines, WHEREAS clauses followed by RESOLVED (or, for finance
+    bills, ENACTED) clauses, each ending in ";", and optionally inline
+    images between clauses.
+
+    Args:
+        stage: 0 for the first reading, 1 for the second, and so on
+        week: Week of the session the bill was first read in
+        outcome: The final version, e.g. "VETOED", if this is it
+        empty: Leave out the short title, as in documents cleanup quarantines
+    """
+    subject = rng.choice(SUBJECTS)
+    lines = [f"**{bill_id.replace('_', ' ')}**", ""]
+    lines.append(
+        f"**A {'BILL' if bill_id.startswith('FB') else 'RESOLUTION'} "
+        f"TO ADDRESS {subject.upper()}**"
+    )
+    lines.append("")
+    if not empty:
+        lines.append(f"**Short Title**: {subject.title()} Act")
+    lines.append(f"**Sponsors**: {_names(rng, rng.randint(1, 4))}")
+    lines.append(f"**Secondary Sponsors**: {_names(rng, rng.randint(0, 3))}")
+    lines.append(f"**First Reading**: {_date(week)}")
+    if stage >= 1:
+        lines.append(f"**Second Reading**: {_date(week + 1)}")
+    lines.append("")
+
+    keyword = "BE IT ENACTED" if bill_id.startswith("FB") else "BE IT RESOLVED"
+    clauses = [
+        f"**WHEREAS,** {rng.choice(BODIES)} {_sentence(rng)};"
+        for _ in range(rng.randint(2, 8))
+    ]
+    clauses.append(
+        f"**THEREFORE, {keyword},** that {rng.choice(BODIES)} {_sentence(rng)};"
+    )
+    clauses += [
+        f"**{keyword.replace('BE IT', 'BE IT FURTHER')},** that {_sentence(rng)};"
+        for _ in range(rng.randint(0, 4) + stage)
+    ]
+    for _ in range(images):
+        clauses.insert(rng.randint(0, len(clauses)), _image(rng, image_size))
+    for clause in clauses:
+        lines += [clause, ""]
+
+    if outcome is not None:
+        lines.append(f"**Result:** {OUTCOMES[outcome]}")
+    return "\n".join(lines) + "\n"
+
+
+def bill_pdf(rng: random.Random, size: int) -> bytes:
+    """Stand-in for a downloaded PDF of about `size` bytes; only copied, never parsed."""
+    body = rng.randbytes(max(0, size - 64))
+    return (
+        b"%PDF-1.4\n1 0 obj << /Length "
+        + str(len(body)).encode()
+        + b" >>\nstream\n"
+        + body
+        + b"\nendstream endobj\n%%EOF\n"
+    )
+
+
+def generate_corpus(
+    markdown_dir: str,
+    pdf_dir: str = None,
+    bills: int = 200,
+    seed: int = 0,
+    image_rate: float = 0.1,
+    image_size: int = 200_000,
+    duplicate_rate: float = 0.05,
+    empty_rate: float = 0.02,
+    pdf_size: int = 50_000,
+) -> Dict[str, int]:
+    """
+    Write a synthetic session of bills in the folder layout the pipeline
+    reads: one folder per bill, e.g. "SB_12/SB_12_FIRST_READING.md", with a
+    file per version. Each bill has a first reading and, usually, a second
+    reading and an outcome. Some files also get a duplicate download
+    "X (1).md", inline images or no short title.
+
+    The same seed always gives the same tree. With `pdf_dir`, a PDF is
+    written there for every markdown file, as downloaded before conversion.
+
+    Returns:
+        Counts of bills, markdown files, duplicates and images, and the
+        bytes of markdown and PDF written
+    """
+    rng = random.Random(seed)
+    # Separate, so the markdown is the same with or without PDFs
+    pdf_rng = random.Random(f"pdf-{seed}")
+    stats = dict.fromkeys(
+        ["bills", "files", "duplicates", "images", "markdown_bytes", "pdf_bytes"], 0
+    )
+    numbers: Dict[str, int] = {}
+
+    for _ in range(bills):
+        bill_type = rng.choice(BILL_TYPES)
+        numbers[bill_type] = numbers.get(bill_type, 0) + 1
+        bill_id = f"{bill_type}_{numbers[bill_type]}"
+        week = rng.randint(0, 12)
+
+        versions: List[tuple] = [("FIRST_READING", 0, None)]
+        if rng.random() < 0.8:
+            versions.append(("SECOND_READING", 1, None))
+            if rng.random() < 0.3:
+                versions.append(("ENGROSSED", 2, None))
+            outcome = rng.choices(list(OUTCOMES), weights=[8, 1, 2])[0]
+            versions.append((outcome, len(versions), outcome))
+
+        folders = [os.path.join(markdown_dir, bill_id)]
+        if pdf_dir is not None:
+            folders.append(os.path.join(pdf_dir, bill_id))
+        for folder in folders:
+            os.makedirs(folder, exist_ok=True)
+
+        for version, stage, outcome in versions:
+            images = 0
+            if rng.random() < image_rate:
+                images = rng.randint(1, 3)
+            text = bill_markdown(
+                rng,
+                bill_id,
+                stage,
+                week=week,
+                outcome=outcome,
+                images=images,
+                image_size=image_size,
+                empty=rng.random() < empty_rate,
+            )
+            names = [f"{bill_id}_{version}"]
+            if rng.random() < duplicate_rate:
+                names.append(f"{bill_id}_{version} (1)")
+                stats["duplicates"] += 1
+
+            pdf = bill_pdf(pdf_rng, pdf_size) if pdf_dir is not None else None
+            for name in names:
+                with open(
+                    os.path.join(markdown_dir, bill_id, f"{name}.md"),
+                    "w",
+                    encoding="utf-8",
+                ) as f:
+                    f.write(text)
+                stats["files"] += 1
+                stats["markdown_bytes"] += len(text.encode("utf-8"))
+                if pdf is not None:
+                    with open(os.path.join(pdf_dir, bill_id, f"{name}.pdf"), "wb") as f:
+                        f.write(pdf)
+                    stats["pdf_bytes"] += len(pdf)
+            stats["images"] += images
+
+        stats["bills"] += 1
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic tree of converted bills."
+    )
+    parser.add_argument("output_dir")
+    parser.add_argument("--pdf-dir", help="Also write a PDF per file here")
+    parser.add_argument("--bills", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--image-rate", type=float, default=0.1)
+    parser.add_argument("--image-size", type=int, default=200_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    stats = generate_corpus(
+        args.output_dir,
+        args.pdf_dir,
+        bills=args.bills,
+        seed=args.seed,
+        image_rate=args.image_rate,
+        image_size=args.image_size,
+        duplicate_rate=args.duplicate_rate,
+    )
+    print(
+        f"Wrote {stats['files']} files for {stats['bills']} bills "
+        f"({stats['duplicates']} duplicates, {stats['images']} images, "
+        f"{stats['markdown_bytes'] / 1_000_000:.1f} MB) to {args.output_dir}"
+    )
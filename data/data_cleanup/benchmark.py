@@ -0,0 +1,236 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from bill_parser import parse_bill, parse_bill_file
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+INPUT_DIR = "./converted_docs"
+# Markdown files, each with the output the reference gives for it beside it
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def reference_parse(content):
+    """
+    The regex-per-field extraction the parser replaced, kept as the golden
+    reference its output is checked against.
+    """
+    clean_text = re.sub(r"!\[\]\(data:image\/png;base64,[^)]+\)", "", content)
+
+    lines = clean_text.split("\n")
+
+    long_title = lines[2].strip("**") if len(lines) >= 3 else None
+
+    short_title_match = re.search(r"\*\*Short Title\*\*: (.*?)\n", clean_text)
+    sponsors_match = re.search(r"\*\*Sponsors\*\*:(.*?)\n", clean_text, re.DOTALL)
+    secondary_sponsors_match = re.search(
+        r"\*\*Secondary Sponsors\*\*:(.*?)\n", clean_text, re.DOTALL
+    )
+    first_reading_match = re.search(r"\*\*First Reading\*\*: (.*?)\n", clean_text)
+    second_reading_match = re.search(r"\*\*Second Reading\*\*: (.*?)\n", clean_text)
+    result_match = re.search(r"\*\*Result:\*\* (.*?)\n", clean_text)
+
+    whereas_clauses = re.findall(
+        r"^\*\*.*WHEREAS,?\*\*,?\s*(.*?);", clean_text, re.MULTILINE
+    )
+    enacted_clauses = re.findall(
+        r"^\*\*.*ENACTED,?\*\*,?\s*(.*?);", clean_text, re.MULTILINE
+    )
+    resolved_clauses = re.findall(
+        r"^\*\*.*RESOLVED,?\*\*,?\s*(.*?);", clean_text, re.MULTILINE
+    )
+
+    whereas_full = re.findall(
+        r"(^\*\*\s*WHEREAS,?\*\*,?.*?;)", clean_text, re.MULTILINE
+    )
+    enacted_full = re.findall(r"(^\*\*.*ENACTED,?\*\*,?.*?;)", clean_text, re.MULTILINE)
+    resolved_full = re.findall(
+        r"(^\*\*.*RESOLVED,?\*\*,?.*?;)", clean_text, re.MULTILINE
+    )
+
+    full_text = "\n".join(whereas_full + enacted_full + resolved_full).strip()
+
+    return {
+        "long_title": long_title,
+        "short_title": short_title_match.group(1) if short_title_match else None,
+        "sponsors": (
+            [s.strip() for s in sponsors_match.group(1).split(",")]
+            if sponsors_match
+            else []
+        ),
+        "secondary_sponsors": (
+            [s.strip() for s in secondary_sponsors_match.group(1).split(",")]
+            if secondary_sponsors_match
+            else []
+        ),
+        "first_reading": first_reading_match.group(1) if first_reading_match else None,
+        "second_reading": (
+            second_reading_match.group(1) if second_reading_match else None
+        ),
+        "result": result_match.group(1) if result_match else None,
+        "whereas_clauses": whereas_clauses,
+        "enacted_clauses": enacted_clauses,
+        "resolved_clauses": resolved_clauses,
+        "full_text": full_text,
+    }
+
+
+def parse_reference(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return reference_parse(f.read())
+
+
+def parse_in_memory(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_bill(f.read())
+
+
+# Name -> function parsing one file, from the old code path to the current one
+APPROACHES = {
+    "reference": parse_reference,
+    "in-memory": parse_in_memory,
+    "streaming": parse_bill_file,
+}
+
+
+def find_documents(input_dir):
+    paths = []
+    for root, _, files in os.walk(input_dir):
+        for file in sorted(files):
+            if file.endswith(".md"):
+                paths.append(os.path.join(root, file))
+    return sorted(paths)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None if unknown."""
+    # On Linux ru_maxrss survives exec, so a spawned child would report its
+    # parent's peak; VmHWM starts afresh with the new program
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_approach(name, paths, repeat):
+    """Best time over `repeat` passes through every file, and the peak RSS."""
+    parse = APPROACHES[name]
+    baseline = peak_rss_mb()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for path in paths:
+            parse(path)
+        best = min(best, time.perf_counter() - started)
+    return {"seconds": best, "peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": baseline}
+
+
+def measure(name, paths, repeat):
+    """run_approach in a fresh process, so peak memory is its own."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_approach, name, paths, repeat).result()
+
+
+def check_outputs(paths):
+    """Paths whose parsed output differs from the reference."""
+    return [path for path in paths if parse_bill_file(path) != parse_reference(path)]
+
+
+def fixture_paths():
+    return sorted(
+        os.path.join(FIXTURE_DIR, f)
+        for f in os.listdir(FIXTURE_DIR)
+        if f.endswith(".md")
+    )
+
+
+def check_fixtures(update=False):
+    """
+    Fixtures for which some approach's output differs from the expected
+    JSON saved beside them. With `update`, first save the reference's output
+    as the expected one.
+    """
+    mismatches = []
+    for path in fixture_paths():
+        expected_path = os.path.splitext(path)[0] + ".json"
+        if update:
+            with open(expected_path, "w", encoding="utf-8") as f:
+                json.dump(parse_reference(path), f, indent=4, ensure_ascii=False)
+                f.write("\n")
+        with open(expected_path, "r", encoding="utf-8") as f:
+            expected = json.load(f)
+        for name, parse in APPROACHES.items():
+            if parse(path) != expected:
+                mismatches.append(f"{os.path.basename(path)} ({name})")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the bill parser against the reference and the fixtures, and time each approach."
+    )
+    parser.add_argument("input_dir", nargs="?", default=INPUT_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--fixtures-only",
+        action="store_true",
+        help="Only check the output for the fixtures against the expected JSON",
+    )
+    parser.add_argument(
+        "--update-fixtures",
+        action="store_true",
+        help="Save the reference's output for the fixtures as the expected JSON",
+    )
+    args = parser.parse_args()
+
+    fixture_mismatches = check_fixtures(args.update_fixtures)
+    for fixture in fixture_mismatches:
+        print(f"Output differs from the expected fixture output: {fixture}")
+    print(f"{len(fixture_paths())} fixtures checked")
+    if args.fixtures_only:
+        sys.exit(1 if fixture_mismatches else 0)
+
+    paths = find_documents(args.input_dir)
+    if not paths:
+        sys.exit(f"No markdown files in {args.input_dir}")
+    size = sum(os.path.getsize(path) for path in paths)
+
+    mismatches = check_outputs(paths)
+    for path in mismatches:
+        print(f"Output differs from the reference: {path}")
+    print(f"{len(paths) - len(mismatches)}/{len(paths)} documents match")
+
+    results = {name: measure(name, paths, args.repeat) for name in APPROACHES}
+    for name, result in results.items():
+        seconds = result["seconds"]
+        line = (
+            f"{name:>9}: {len(paths) / seconds:,.0f} docs/s, "
+            f"{size / seconds / 1_000_000:.1f} MB/s"
+        )
+        if result["peak_rss_mb"] is not None:
+            line += (
+                f", peak RSS {result['peak_rss_mb']:.1f} MB "
+                f"(+{result['peak_rss_mb'] - result['baseline_rss_mb']:.1f} MB)"
+            )
+        print(line)
+    speedup = results["reference"]["seconds"] / results["streaming"]["seconds"]
+    print(f"  speedup: {speedup:.2f}x")
+
+    sys.exit(1 if mismatches or fixture_mismatches else 0)
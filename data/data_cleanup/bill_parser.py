@@ -0,0 +1,232 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Bump when parsing changes, so cleanup redoes files it considers current
+PARSER_VERSION = 1
+
+IMAGE_PATTERN = re.compile(r"!\[\]\(data:image\/png;base64,[^)]+\)")
+IMAGE_PREFIX = "![](data:image/png;base64,"
+# Characters read at a time when stripping images from a file
+IMAGE_CHUNK_SIZE = 1 << 20
+
+# Metadata lines look like "**Short Title**: ..."; each field is the rest of
+# the first line carrying its marker
+FIELD_MARKERS = {
+    "short_title": "**Short Title**: ",
+    "sponsors": "**Sponsors**:",
+    "secondary_sponsors": "**Secondary Sponsors**:",
+    "first_reading": "**First Reading**: ",
+    "second_reading": "**Second Reading**: ",
+    "result": "**Result:** ",
+}
+CLAUSE_TYPES = ["whereas", "enacted", "resolved"]
+KEYWORD_PATTERNS = {
+    clause_type: re.compile(clause_type.upper() + r",?\*\*,?")
+    for clause_type in CLAUSE_TYPES
+}
+SPACE_PATTERN = re.compile(r"\s*")
+
+
+def split_list(value: Optional[str]) -> List[str]:
+    return [s.strip() for s in value.split(",")] if value is not None else []
+
+
+def _skip_space(lines: List[str], i: int, col: int) -> Tuple[int, int]:
+    """Skip whitespace, newlines included, from column `col` of line `i`."""
+    while True:
+        col = SPACE_PATTERN.match(lines[i], col).end()
+        if col < len(lines[i]) or i + 1 == len(lines):
+            return i, col
+        i, col = i + 1, 0
+
+
+class BillParser:
+    """
+    Single-pass, line-oriented parser for a bill converted to markdown.
+
+    Reads each line once, tracking for every field and clause list where it
+    may next match, and extracts the same values as searching the whole text
+    with the patterns below. Clause lists are what
+    `^\\*\\*.*KEYWORD,?\\*\\*,?\\s*(.*?);` finds, and the full clauses what
+    `(^\\*\\*\\s*WHEREAS,?\\*\\*,?.*?;)` and `(^\\*\\*.*KEYWORD,?\\*\\*,?.*?;)`
+    find (all MULTILINE). That includes their quirks: a keyword may be
+    separated from its text by blank lines, and a clause found that way
+    consumes the line its text is on.
+    """
+
+    def __init__(self, text: str):
+        self.lines = text.split("\n")
+
+    def parse(self) -> dict:
+        lines = self.lines
+        fields: Dict[str, Optional[str]] = dict.fromkeys(FIELD_MARKERS)
+        pending_fields = dict(FIELD_MARKERS)
+        clauses: Dict[str, List[str]] = {t: [] for t in CLAUSE_TYPES}
+        full: Dict[str, List[str]] = {t: [] for t in CLAUSE_TYPES}
+        # First line each clause scan may start a match on
+        next_clause = dict.fromkeys(CLAUSE_TYPES, 0)
+        next_full = dict.fromkeys(CLAUSE_TYPES, 0)
+        last = len(lines) - 1
+
+        for i, line in enumerate(lines):
+            if "**" not in line:
+                continue
+
+            # A field's value runs to the end of its line, so it needs a newline
+            if pending_fields and i < last:
+                for name, marker in list(pending_fields.items()):
+                    start = line.find(marker)
+                    if start != -1:
+                        fields[name] = line[start + len(marker) :]
+                        del pending_fields[name]
+
+            if not line.startswith("**"):
+                continue
+            for clause_type in CLAUSE_TYPES:
+                if next_clause[clause_type] <= i:
+                    found = self._clause(i, clause_type)
+                    if found is not None:
+                        clauses[clause_type].append(found[0])
+                        next_clause[clause_type] = found[1] + 1
+                if next_full[clause_type] <= i:
+                    found = (
+                        self._whereas_full(i)
+                        if clause_type == "whereas"
+                        else self._full(i, clause_type)
+                    )
+                    if found is not None:
+                        full[clause_type].append(found[0])
+                        next_full[clause_type] = found[1] + 1
+
+        return {
+            "long_title": lines[2].strip("**") if len(lines) >= 3 else None,
+            "short_title": fields["short_title"],
+            "sponsors": split_list(fields["sponsors"]),
+            "secondary_sponsors": split_list(fields["secondary_sponsors"]),
+            "first_reading": fields["first_reading"],
+            "second_reading": fields["second_reading"],
+            "result": fields["result"],
+            "whereas_clauses": clauses["whereas"],
+            "enacted_clauses": clauses["enacted"],
+            "resolved_clauses": clauses["resolved"],
+            "full_text": "\n".join(
+                clause for t in CLAUSE_TYPES for clause in full[t]
+            ).strip(),
+        }
+
+    def _keywords(self, i: int, clause_type: str):
+        # The last keyword on the line is tried first, as a greedy .* would
+        matches = list(KEYWORD_PATTERNS[clause_type].finditer(self.lines[i], 2))
+        return reversed(matches)
+
+    def _clause(self, i: int, clause_type: str) -> Optional[Tuple[str, int]]:
+        """Clause text after the keyword on line `i`, and the line it ends on."""
+        for keyword in self._keywords(i, clause_type):
+            j, col = _skip_space(self.lines, i, keyword.end())
+            end = self.lines[j].find(";", col)
+            if end != -1:
+                return self.lines[j][col:end], j
+        return None
+
+    def _full(self, i: int, clause_type: str) -> Optional[Tuple[str, int]]:
+        """Line `i` up to the end of its clause."""
+        line = self.lines[i]
+        for keyword in self._keywords(i, clause_type):
+            end = line.find(";", keyword.end())
+            if end != -1:
+                return line[: end + 1], i
+        return None
+
+    def _whereas_full(self, i: int) -> Optional[Tuple[str, int]]:
+        """
+        Like _full, but the keyword must directly follow the opening "**",
+        give or take whitespace.
+        """
+        j, col = _skip_space(self.lines, i, 2)
+        keyword = KEYWORD_PATTERNS["whereas"].match(self.lines[j], col)
+        if keyword is None:
+            return None
+        end = self.lines[j].find(";", keyword.end())
+        if end == -1:
+            return None
+        return "\n".join(self.lines[i:j] + [self.lines[j][: end + 1]]), j
+
+
+def strip_images(text: str) -> str:
+    """Drop inline base64 PNGs that markitdown embeds for scanned pages."""
+    return IMAGE_PATTERN.sub("", text)
+
+
+def read_without_images(path: str, chunk_size: int = IMAGE_CHUNK_SIZE) -> str:
+    """
+    Read a markdown file, dropping inline base64 PNGs as it goes.
+
+    Gives the same text as reading the whole file and applying strip_images,
+    but image data is skipped chunk by chunk instead of being held in
+    memory, so a multi-megabyte scan costs at most `chunk_size` characters.
+    """
+    kept: List[str] = []
+    carry = ""
+    offset = 0  # Position of carry in the file, in characters
+    image_start = None  # Position of the image being skipped, if any
+    image_chars = 0
+
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            text = carry + chunk
+            pos = 0
+            while pos < len(text):
+                if image_start is None:
+                    start = text.find(IMAGE_PREFIX, pos)
+                    if start == -1:
+                        # Hold back what could be the start of a split prefix
+                        end = len(text)
+                        if chunk:
+                            end = max(pos, end - len(IMAGE_PREFIX) + 1)
+                        kept.append(text[pos:end])
+                        pos = end
+                        break
+                    kept.append(text[pos:start])
+                    image_start = offset + start
+                    image_chars = 0
+                    pos = start + len(IMAGE_PREFIX)
+                else:
+                    end = text.find(")", pos)
+                    if end == -1:
+                        image_chars += len(text) - pos
+                        pos = len(text)
+                        break
+                    image_chars += end - pos
+                    if not image_chars:
+                        # An empty data URI is not an image; keep it as text
+                        kept.append(IMAGE_PREFIX)
+                        pos = end
+                    else:
+                        pos = end + 1
+                    image_start = None
+            carry = text[pos:]
+            offset += pos
+            if not chunk:
+                break
+
+    if image_start is not None:
+        # The last image is never closed, so it is not stripped either. No
+        # ")" follows it, so nothing after it can be an image.
+        with open(path, "r", encoding="utf-8") as f:
+            remaining = image_start
+            while remaining:
+                remaining -= len(f.read(min(remaining, chunk_size)))
+            kept.append(f.read())
+
+    return "".join(kept)
+
+
+def parse_bill(text: str) -> dict:
+    """Extract the title, metadata and clauses from a bill's markdown."""
+    return BillParser(strip_images(text)).parse()
+
+
+def parse_bill_file(path: str) -> dict:
+    """parse_bill for a file, without loading its images into memory."""
+    return BillParser(read_without_images(path)).parse()
@@ -0,0 +1,407 @@
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from bill_parser import PARSER_VERSION, parse_bill_file
+
+INPUT_DIR = "./converted_docs"
+OUTPUT_DIR = "./cleaned_json"
+UNPROCESSED_DIR = "./unprocessed"
+SESSION = "104"
+CLEANUP_MANIFEST_FILE = os.getenv("CLEANUP_MANIFEST_FILE", "./cleanup_manifest.json")
+CLEANUP_WORKERS = int(os.getenv("CLEANUP_WORKERS", str(os.cpu_count() or 1)))
+# Consolidated copy of the cleaned files, read by doc-retrieval's corpus.py
+CORPUS_INDEX_FILE = "corpus.index"
+CORPUS_FORMAT = 1
+DUPLICATE_COPY_PATTERN = re.compile(r" \(\d+\)\.md$")
+# Below this many changed files, starting worker processes costs more than it saves
+MIN_PARALLEL_FILES = 16
+
+
+def clean_and_convert_to_json(file_path, legislative_id, session, version, filename):
+    data = {
+        "id": f"{legislative_id}_{session}_{version}".lower(),
+        "version": version,
+        **parse_bill_file(file_path),
+        "filename": filename,
+        "session": session,
+    }
+
+    return data
+
+
+def get_version_from_filename(filename):
+    if "FIRST_READING" in filename:
+        return "first_reading"
+    elif "SECOND_READING" in filename:
+        return "second_reading"
+    elif "OFFICIATED" in filename:
+        return "officiated"
+    elif "VETOED" in filename:
+        return "vetoed"
+    elif "FAILED" in filename:
+        return "failed"
+    elif "ENGROSSED" in filename:
+        return "engrossed"
+    else:
+        return "unknown"
+
+
+def is_overly_empty(data):
+    essential_fields = [
+        "long_title",
+        "short_title",
+        "sponsors",
+        "whereas_clauses",
+        "resolved_clauses",
+    ]
+    for field in essential_fields:
+        if isinstance(data[field], list) and not data[field]:
+            continue
+        if not data[field]:
+            return True
+    return False
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path: str, data):
+    """Write JSON so readers see either the old file or the whole new one."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        json.dump(data, out, indent=4)
+    os.replace(tmp_path, path)
+
+
+class CleanupManifest:
+    """
+    Record of each converted markdown file as of its last cleanup: its size,
+    modification time and content hash, and the JSON file written for it.
+
+    A file whose size and mtime are unchanged is skipped without being read;
+    one that was touched but not modified is skipped after hashing. Bumping
+    the parser version invalidates every entry.
+    """
+
+    def __init__(self, path: str = CLEANUP_MANIFEST_FILE):
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("parser_version") == PARSER_VERSION:
+                self.files = saved.get("files", {})
+        except FileNotFoundError:
+            pass
+
+    def is_current(self, key: str, stat: os.stat_result) -> bool:
+        entry = self.files.get(key)
+        return (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and os.path.exists(entry["output"])
+        )
+
+    def recorded_hash(self, key: str) -> Optional[str]:
+        entry = self.files.get(key)
+        if entry is None or not os.path.exists(entry["output"]):
+            return None
+        return entry["hash"]
+
+    def record(self, key: str, stat: os.stat_result, digest: str, output: str):
+        self.files[key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": digest,
+            "output": output,
+        }
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # One dumps call runs the C encoder; streaming with dump() does not
+            f.write(json.dumps({"parser_version": PARSER_VERSION, "files": self.files}))
+        os.replace(tmp_path, self.path)
+
+
+def find_inputs(input_dir: str = INPUT_DIR) -> List[Tuple[str, str, str]]:
+    """(path relative to input_dir, legislative ID, file name) of each markdown file."""
+    inputs = []
+    for legislative_id in sorted(os.listdir(input_dir)):
+        folder_path = os.path.join(input_dir, legislative_id)
+        if os.path.isdir(folder_path):
+            # Originals before duplicate downloads such as "X (1).md"
+            files = sorted(
+                os.listdir(folder_path),
+                key=lambda f: (DUPLICATE_COPY_PATTERN.search(f) is not None, f),
+            )
+            for file in files:
+                if file.endswith(".md"):
+                    inputs.append(
+                        (os.path.join(legislative_id, file), legislative_id, file)
+                    )
+    return inputs
+
+
+def clean_file(task: tuple) -> dict:
+    """
+    Clean one markdown file unless its hash matches the recorded one. Runs
+    in a worker process.
+
+    Returns:
+        The file's hash, and the output path and whether it was quarantined
+        if it was cleaned
+    """
+    file_path, legislative_id, file, recorded_hash, output_dir, unprocessed_dir = task
+    digest = file_sha256(file_path)
+    if digest == recorded_hash:
+        return {"hash": digest, "output": None}
+
+    version = get_version_from_filename(file)
+    data = clean_and_convert_to_json(file_path, legislative_id, SESSION, version, file)
+    quarantined = is_overly_empty(data)
+    output_file = os.path.join(
+        unprocessed_dir if quarantined else output_dir,
+        f"{legislative_id}_{SESSION}_{version}.json",
+    )
+    write_json_atomic(output_file, data)
+    return {"hash": digest, "output": output_file, "quarantined": quarantined}
+
+
+def run_cleanup(
+    input_dir: str = INPUT_DIR,
+    output_dir: str = OUTPUT_DIR,
+    unprocessed_dir: str = UNPROCESSED_DIR,
+    workers: int = CLEANUP_WORKERS,
+    force: bool = False,
+) -> dict:
+    """
+    Clean every new or changed markdown file in `input_dir`, spreading the
+    files over a pool of worker processes.
+
+    Files the manifest shows unchanged are skipped, and the outputs of files
+    that disappeared are deleted. When several files map to the same output
+    (e.g. "X.md" and a duplicate download "X (1).md"), only the original is
+    cleaned.
+
+    Returns:
+        Counts of files processed, skipped, quarantined, removed and
+        duplicate, plus the elapsed seconds
+    """
+    started = time.monotonic()
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(unprocessed_dir, exist_ok=True)
+    manifest = CleanupManifest()
+
+    inputs = {}
+    duplicates = 0
+    for key, legislative_id, file in find_inputs(input_dir):
+        output_name = (legislative_id, get_version_from_filename(file))
+        if output_name in inputs:
+            duplicates += 1
+            continue
+        inputs[output_name] = (key, legislative_id, file)
+
+    tasks, keys, stats, skipped = [], [], {}, 0
+    for key, legislative_id, file in inputs.values():
+        file_path = os.path.join(input_dir, key)
+        stats[key] = os.stat(file_path)
+        if not force and manifest.is_current(key, stats[key]):
+            skipped += 1
+            continue
+        recorded_hash = None if force else manifest.recorded_hash(key)
+        keys.append(key)
+        tasks.append(
+            (
+                file_path,
+                legislative_id,
+                file,
+                recorded_hash,
+                output_dir,
+                unprocessed_dir,
+            )
+        )
+
+    executor = None
+    if workers > 1 and len(tasks) >= MIN_PARALLEL_FILES:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(
+            clean_file, tasks, chunksize=max(1, len(tasks) // (4 * workers))
+        )
+    else:
+        results = map(clean_file, tasks)
+
+    processed = quarantined = 0
+    # File names of the outputs written this run
+    changed = set()
+    try:
+        for task, key, result in zip(tasks, keys, results):
+            output = result["output"]
+            if output is None:
+                skipped += 1
+                output = manifest.files[key]["output"]
+            else:
+                processed += 1
+                quarantined += result["quarantined"]
+                changed.add(os.path.basename(output))
+                print(f"Processed {task[0]} -> {output}")
+                # A file that moved in or out of quarantine leaves a copy behind
+                previous = manifest.files.get(key, {}).get("output")
+                if previous and previous != output and os.path.exists(previous):
+                    os.remove(previous)
+            manifest.record(key, stats[key], result["hash"], output)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    removed = 0
+    live = {manifest.files[key]["output"] for key in stats}
+    for key in [key for key in manifest.files if key not in stats]:
+        output = manifest.files.pop(key)["output"]
+        if output not in live and os.path.exists(output):
+            os.remove(output)
+        removed += 1
+
+    corpus = None
+    if (
+        processed
+        or removed
+        or not os.path.exists(os.path.join(output_dir, CORPUS_INDEX_FILE))
+    ):
+        corpus = write_corpus(output_dir, changed)
+
+    # Saved last, so a run interrupted before the corpus was written redoes
+    # the changed files and rewrites it next time
+    manifest.save()
+
+    return {
+        "processed": processed,
+        "skipped": skipped,
+        "quarantined": quarantined,
+        "removed": removed,
+        "duplicates": duplicates,
+        "corpus": corpus,
+        "seconds": time.monotonic() - started,
+    }
+
+
+def read_corpus_index(output_dir: str = OUTPUT_DIR) -> Optional[dict]:
+    """The corpus index in `output_dir`, or None if there is no usable corpus."""
+    try:
+        with open(
+            os.path.join(output_dir, CORPUS_INDEX_FILE), "r", encoding="utf-8"
+        ) as f:
+            index = json.load(f)
+        data_size = os.path.getsize(os.path.join(output_dir, index["data"]))
+    except (OSError, ValueError, KeyError):
+        return None
+    if index.get("format") != CORPUS_FORMAT or data_size != index.get("size"):
+        return None
+    return index
+
+
+def copy_range(src, out, offset: int, length: int):
+    if not length:
+        return
+    src.seek(offset)
+    while length:
+        block = src.read(min(length, 1 << 20))
+        if not block:
+            raise ValueError("Corpus data file is shorter than its index")
+        out.write(block)
+        length -= len(block)
+
+
+def write_corpus(
+    output_dir: str = OUTPUT_DIR, changed: Optional[Set[str]] = None
+) -> int:
+    """
+    Consolidate every cleaned file in `output_dir` into one JSONL file, one
+    document per line in file name order, plus corpus.index listing each
+    document's file name, ID and byte range.
+
+    Documents not in `changed` (file names) are copied from the previous
+    corpus as they are, in runs of consecutive lines, so a run that cleaned
+    a few files reads and serializes only those. With `changed` None, or no
+    usable previous corpus, every file is read.
+
+    The data file gets a new name each time and the index is replaced last,
+    so a reader always sees an index and the data it points to.
+
+    Returns:
+        The number of documents written
+    """
+    names = sorted(f for f in os.listdir(output_dir) if f.endswith(".json"))
+    previous_index = read_corpus_index(output_dir) if changed is not None else None
+    previous: Dict[str, list] = {}
+    if previous_index is not None:
+        previous = {entry[0]: entry for entry in previous_index["documents"]}
+
+    tmp_path = os.path.join(output_dir, f"corpus.{os.getpid()}.tmp")
+    documents = []
+    offset = 0
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(open(tmp_path, "wb"))
+        src = None
+        if previous:
+            src = stack.enter_context(
+                open(os.path.join(output_dir, previous_index["data"]), "rb")
+            )
+        # Byte range of the previous corpus still to be copied
+        run_start = run_end = 0
+        for name in names:
+            entry = previous.get(name)
+            if entry is not None and name not in changed:
+                _, doc_id, old_offset, length = entry
+                if old_offset != run_end:
+                    copy_range(src, out, run_start, run_end - run_start)
+                    run_start = old_offset
+                run_end = old_offset + length
+            else:
+                copy_range(src, out, run_start, run_end - run_start)
+                run_start = run_end = 0
+                with open(os.path.join(output_dir, name), "r", encoding="utf-8") as f:
+                    content = json.load(f)
+                line = (json.dumps(content, ensure_ascii=False) + "\n").encode("utf-8")
+                out.write(line)
+                doc_id, length = content.get("id"), len(line)
+            documents.append([name, doc_id, offset, length])
+            offset += length
+        copy_range(src, out, run_start, run_end - run_start)
+
+    data_name = f"corpus-{uuid.uuid4().hex[:16]}.jsonl"
+    os.replace(tmp_path, os.path.join(output_dir, data_name))
+    index = {
+        "format": CORPUS_FORMAT,
+        "data": data_name,
+        "size": offset,
+        "documents": documents,
+    }
+    index_path = os.path.join(output_dir, CORPUS_INDEX_FILE)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # One dumps call runs the C encoder; streaming with dump() does not
+        f.write(json.dumps(index))
+    os.replace(tmp_path, index_path)
+
+    for name in os.listdir(output_dir):
+        if name.startswith("corpus-") and name.endswith(".jsonl") and name != data_name:
+            try:
+                os.remove(os.path.join(output_dir, name))
+            except OSError:
+                # Still open in a reader on a platform that forbids deleting
+                # open files; the next rewrite removes it
+                pass
+    return len(documents)
@@ -1,18 +1,44 @@
 from fastapi import FastAPI
-from retrieval import retrieve, retrieve_with_reranking, get_document_metadata
+from retrieval import (
+    aretrieve_summaries,
+    aretrieve_with_reranking,
+    aretrieve_with_reranking_multi,
+    get_document_metadata,
+)
+from connection import (
+    lazy_singleton,
+    get_embedding,
+    get_summary_vector_store,
+    get_chunk_vector_store,
+)
+from document_store import get_document_store
+from lexical_index import get_lexical_index
+from reranking import get_reranker
+from result_cache import ResultCache, normalize_query
+from warmup import run_warmup, format_report
+from metrics import (
+    METRICS_ENABLED,
+    REQUEST_SECONDS,
+    TIME_TO_FIRST_TOKEN_SECONDS,
+    STREAM_SECONDS,
+    LLM_TOKENS,
+    render_metrics,
+)
 from pydantic import BaseModel
+from langchain_core.documents import Document
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-import json
+from fastapi.responses import StreamingResponse, PlainTextResponse
 import os.path
-import anthropic
 import time
+import asyncio
 from typing import Optional, List
 from dotenv import load_dotenv
 
 load_dotenv()
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+# Query used to pre-connect to the vector stores on startup; empty disables it
+WARMUP_QUERY = os.getenv("WARMUP_QUERY", "student government legislation")
 
 app = FastAPI()
 
@@ -24,20 +50,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-anthropic_client = anthropic.Anthropic(
-    api_key=ANTHROPIC_API_KEY,
-)
+result_cache = ResultCache()
+
+
+@lazy_singleton
+def get_anthropic_client():
+    import anthropic
+
+    return anthropic.AsyncAnthropic(
+        api_key=ANTHROPIC_API_KEY,
+    )
 
 
 class DocQuery(BaseModel):
     query: str
     doc_id: Optional[str] = None
     top_k: Optional[int] = 3
+    # Bill version to search, e.g. "first_reading"; defaults to each bill's latest
+    version: Optional[str] = None
 
 
 class ChatRequest(BaseModel):
     messages: List[dict]
     doc_ids: Optional[List[str]] = None
+    version: Optional[str] = None
+
+
+def warm_up() -> dict:
+    steps = [
+        ("document_store", get_document_store),
+        ("lexical_index", get_lexical_index),
+        ("embedding_client", get_embedding),
+        ("summary_vector_store", get_summary_vector_store),
+        ("chunk_vector_store", get_chunk_vector_store),
+        ("reranker", get_reranker),
+        ("anthropic_client", get_anthropic_client),
+    ]
+    if WARMUP_QUERY:
+        steps += [
+            (
+                "summary_search",
+                lambda: get_summary_vector_store().similarity_search(WARMUP_QUERY, k=1),
+            ),
+            (
+                "chunk_search",
+                lambda: get_chunk_vector_store().similarity_search(WARMUP_QUERY, k=1),
+            ),
+        ]
+    report = run_warmup(steps)
+    print(format_report(report))
+    return report
+
+
+@app.on_event("startup")
+async def start_warmup():
+    # Warm up in the background so the worker accepts requests immediately;
+    # anything not ready yet is created on first use
+    app.state.startup_report = None
+
+    async def run():
+        app.state.startup_report = await asyncio.to_thread(warm_up)
+
+    app.state.warmup_task = asyncio.create_task(run())
+
+
+@app.get("/startup-report")
+async def startup_report():
+    return app.state.startup_report or {"status": "warming up"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @app.get("/")
@@ -60,9 +146,20 @@ async def doc_retrieval(body: DocQuery):
     query = body.query
     doc_id = body.doc_id
     top_k = body.top_k if body.top_k is not None else 3
+    version = body.version
+
+    cache_key = (normalize_query(query), top_k, doc_id, version)
+    with REQUEST_SECONDS.time("doc-retrieval"):
+        return await result_cache.get_or_compute(
+            cache_key, lambda: search_documents(query, doc_id, top_k, version)
+        )
 
+
+async def search_documents(
+    query: str, doc_id: Optional[str], top_k: int, version: Optional[str] = None
+) -> dict:
     if doc_id:
-        results = retrieve_with_reranking(query, doc_id, top_k)
+        results = await aretrieve_with_reranking(query, doc_id, top_k, version)
 
         formatted_results = []
         for doc in results:
@@ -84,7 +181,7 @@ async def doc_retrieval(body: DocQuery):
         }
     else:
 
-        results = retrieve(query, top_k)
+        results = await aretrieve_summaries(query, top_k, version)
 
         formatted_results = []
         for doc in results:
@@ -92,7 +189,10 @@ async def doc_retrieval(body: DocQuery):
             formatted_results.append(
                 {
                     "id": doc_id,
-                    "summary": doc.page_content,
+                    # Bills found only by keyword search have no summary
+                    "summary": (
+                        None if doc.metadata.get("lexical_only") else doc.page_content
+                    ),
                     "metadata": doc.metadata,
                     "excerpt": doc.metadata.get("excerpt", ""),
                 }
@@ -110,8 +210,9 @@ async def claude_stream(payload: ChatRequest):
     """
     messages = payload.messages
     doc_ids = payload.doc_ids or []
+    version = payload.version
 
-    def generate():
+    async def generate():
         try:
             # Check if this is a question about specific documents
             if doc_ids:
@@ -125,48 +226,17 @@ async def claude_stream(payload: ChatRequest):
                         latest_query = msg.get("content", "")
                         break
 
-                # Create context from all selected documents
-                content = []
+                # Retrieve chunks for every document with a single vector query
+                chunks_by_doc = await aretrieve_with_reranking_multi(
+                    latest_query, doc_ids, k=2, version=version
+                )
+                document_contexts = [
+                    build_document_context(doc_id, chunks)
+                    for doc_id, chunks in chunks_by_doc.items()
+                ]
 
-                # Process each document
-                for doc_id in doc_ids:
-                    # Get relevant chunks for this question and document
-                    chunks = retrieve_with_reranking(latest_query, doc_id, k=2)
-
-                    if not chunks:
-                        continue
-
-                    # Get document metadata
-                    doc_metadata = get_document_metadata(doc_id)
-
-                    # Add document metadata as context
-                    content.append(
-                        {
-                            "type": "document",
-                            "source": {
-                                "type": "text",
-                                "media_type": "text/plain",
-                                "data": f"Document ID: {doc_id}\nTitle: {doc_metadata.get('long_title')}\nShort Title: {doc_metadata.get('short_title')}\nResult: {doc_metadata.get('result')}",
-                            },
-                            "title": f"Document {doc_id} Metadata",
-                            "citations": {"enabled": True},
-                        }
-                    )
-
-                    # Add chunks from this document
-                    for chunk in chunks:
-                        content.append(
-                            {
-                                "type": "document",
-                                "source": {
-                                    "type": "text",
-                                    "media_type": "text/plain",
-                                    "data": chunk.page_content,
-                                },
-                                "title": f"Document {doc_id} (Chunk {chunk.metadata.get('chunk_id')})",
-                                "citations": {"enabled": True},
-                            }
-                        )
+                # Create context from all selected documents
+                content = [block for context in document_contexts for block in context]
 
                 if not content:
                     yield "I couldn't find relevant information in these documents. Please try a different question."
@@ -180,13 +250,8 @@ async def claude_stream(payload: ChatRequest):
                 augmented_messages.extend(messages[1:])
 
                 # Stream response from Claude
-                with anthropic_client.messages.stream(
-                    max_tokens=1024,
-                    messages=augmented_messages,
-                    model="claude-3-5-haiku-20241022",
-                ) as stream:
-                    for text in stream.text_stream:
-                        yield text
+                async for text in stream_claude(augmented_messages):
+                    yield text
 
             else:
                 # This is an initial query - use general document search
@@ -200,7 +265,7 @@ async def claude_stream(payload: ChatRequest):
                         break
 
                 # Get relevant document summaries
-                results = retrieve(query, k=3)
+                results = await aretrieve_summaries(query, k=3, version=version)
 
                 if not results:
                     yield "I couldn't find any relevant legislation. Please try a different question."
@@ -210,18 +275,20 @@ async def claude_stream(payload: ChatRequest):
                 content = []
                 for doc in results:
                     doc_id = doc.metadata.get("id")
-                    content.append(
-                        {
-                            "type": "document",
-                            "source": {
-                                "type": "text",
-                                "media_type": "text/plain",
-                                "data": doc.page_content,
-                            },
-                            "title": f"Document {doc_id} Summary",
-                            "citations": {"enabled": True},
-                        }
-                    )
+                    # Bills found only by keyword search have just the excerpt
+                    if not doc.metadata.get("lexical_only"):
+                        content.append(
+                            {
+                                "type": "document",
+                                "source": {
+                                    "type": "text",
+                                    "media_type": "text/plain",
+                                    "data": doc.page_content,
+                                },
+                                "title": f"Document {doc_id} Summary",
+                                "citations": {"enabled": True},
+                            }
+                        )
 
                     # Add excerpt from the full text
                     excerpt = doc.metadata.get("excerpt", "")
@@ -247,15 +314,78 @@ async def claude_stream(payload: ChatRequest):
                 augmented_messages.extend(messages[1:])
 
                 # Stream response from Claude
-                with anthropic_client.messages.stream(
-                    max_tokens=1024,
-                    messages=augmented_messages,
-                    model="claude-3-5-haiku-20241022",
-                ) as stream:
-                    for text in stream.text_stream:
-                        yield text
+                async for text in stream_claude(augmented_messages):
+                    yield text
 
         except Exception as e:
             yield f"\n\nError during streaming: {str(e)}"
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, "claude-stream")
 
+    started = time.perf_counter()
     return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+async def stream_claude(augmented_messages: List[dict]):
+    """Stream Claude's reply, recording time to first token, stream time and usage."""
+    started = time.perf_counter()
+    first_token = True
+    async with get_anthropic_client().messages.stream(
+        max_tokens=1024,
+        messages=augmented_messages,
+        model="claude-3-5-haiku-20241022",
+    ) as stream:
+        async for text in stream.text_stream:
+            if first_token:
+                TIME_TO_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+                first_token = False
+            yield text
+
+        if METRICS_ENABLED:
+            usage = (await stream.get_final_message()).usage
+            LLM_TOKENS.inc(usage.input_tokens, "input")
+            LLM_TOKENS.inc(usage.output_tokens, "output")
+    STREAM_SECONDS.observe(time.perf_counter() - started)
+
+
+def build_document_context(doc_id: str, chunks: List[Document]) -> List[dict]:
+    """
+    Build the Claude document blocks for one document: its metadata followed
+    by the chunks retrieved for the query.
+    """
+    if not chunks:
+        return []
+
+    # Get document metadata
+    doc_metadata = get_document_metadata(doc_id)
+
+    # Add document metadata as context
+    content = [
+        {
+            "type": "document",
+            "source": {
+                "type": "text",
+                "media_type": "text/plain",
+                "data": f"Document ID: {doc_id}\nTitle: {doc_metadata.get('long_title')}\nShort Title: {doc_metadata.get('short_title')}\nResult: {doc_metadata.get('result')}",
+            },
+            "title": f"Document {doc_id} Metadata",
+            "citations": {"enabled": True},
+        }
+    ]
+
+    # Add chunks from this document
+    for chunk in chunks:
+        content.append(
+            {
+                "type": "document",
+                "source": {
+                    "type": "text",
+                    "media_type": "text/plain",
+                    "data": chunk.page_content,
+                },
+                "title": f"Document {doc_id} (Chunk {chunk.metadata.get('chunk_id')})",
+                "citations": {"enabled": True},
+            }
+        )
+
+    return content
@@ -0,0 +1,135 @@
+import re
+from typing import Callable, List, Tuple
+from rate_limiting import count_tokens
+
+CLAUSE_CHUNK_TOKENS = 300
+CLAUSE_TYPES = ["whereas", "enacted", "resolved"]
+# Cleanup writes each clause starting on a bold keyword, e.g. "**WHEREAS,** ..."
+# or "**NOW, THEREFORE, BE IT RESOLVED,** ...", and joins them into full_text.
+CLAUSE_START_PATTERN = re.compile(
+    r"^\*\*[^\n]*?(WHEREAS|ENACTED|RESOLVED),?\*\*", re.MULTILINE
+)
+WORD_PATTERN = re.compile(r"\S+\s*")
+
+
+def split_clauses(content: dict) -> List[Tuple[str, str]]:
+    """
+    Split a cleaned document into (clause type, clause text) pairs, in order.
+
+    Uses full_text when it has clause markers, since that keeps each clause's
+    keyword, and falls back to the separate clause lists otherwise. Text that
+    is not part of any clause has type "text".
+    """
+    full_text = content.get("full_text") or ""
+    starts = list(CLAUSE_START_PATTERN.finditer(full_text))
+
+    if not starts:
+        clauses = [
+            (clause_type, text.strip())
+            for clause_type in CLAUSE_TYPES
+            for text in content.get(f"{clause_type}_clauses") or []
+            if text and text.strip()
+        ]
+        if not clauses and full_text.strip():
+            clauses = [("text", full_text.strip())]
+        return clauses
+
+    clauses = []
+    preamble = full_text[: starts[0].start()].strip()
+    if preamble:
+        clauses.append(("text", preamble))
+    for i, match in enumerate(starts):
+        end = starts[i + 1].start() if i + 1 < len(starts) else len(full_text)
+        clauses.append((match.group(1).lower(), full_text[match.start() : end].strip()))
+    return clauses
+
+
+class ClauseChunker:
+    """
+    Packs whole clauses into chunks of at most `max_tokens` tokens.
+
+    Consecutive clauses of the same type share a chunk while they fit, so a
+    clause is never cut in half and no text is repeated between chunks. A
+    single clause longer than the budget is split between words.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = CLAUSE_CHUNK_TOKENS,
+        model: str = "text-embedding-3-small",
+        token_counter: Callable[[str], int] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter or (lambda text: count_tokens(text, model))
+
+    def split(self, content: dict) -> List[dict]:
+        """
+        Chunk a cleaned document.
+
+        Returns:
+            Dicts with the chunk text, its clause type, the indexes of the
+            first and last clause it covers, and its token count
+        """
+        chunks = []
+        current: List[str] = []
+        current_type = None
+        current_start = 0
+        current_tokens = 0
+
+        def flush(end: int):
+            if current:
+                chunks.append(
+                    {
+                        "text": "\n".join(current),
+                        "clause_type": current_type,
+                        "clause_start": current_start,
+                        "clause_end": end,
+                        "tokens": current_tokens,
+                    }
+                )
+
+        for i, (clause_type, text) in enumerate(split_clauses(content)):
+            tokens = self.token_counter(text)
+            if (
+                current
+                and clause_type == current_type
+                and current_tokens + 1 + tokens <= self.max_tokens
+            ):
+                current.append(text)
+                current_tokens += 1 + tokens
+                continue
+
+            flush(i - 1)
+            current, current_type, current_start, current_tokens = [], None, i, 0
+            if tokens <= self.max_tokens:
+                current, current_type, current_tokens = [text], clause_type, tokens
+                continue
+
+            for piece, piece_tokens in self._split_long(text):
+                chunks.append(
+                    {
+                        "text": piece,
+                        "clause_type": clause_type,
+                        "clause_start": i,
+                        "clause_end": i,
+                        "tokens": piece_tokens,
+                    }
+                )
+
+        flush(current_start + len(current) - 1)
+        return chunks
+
+    def _split_long(self, text: str) -> List[Tuple[str, int]]:
+        pieces = []
+        words: List[str] = []
+        tokens = 0
+        for word in WORD_PATTERN.findall(text):
+            word_tokens = self.token_counter(word)
+            if words and tokens + word_tokens > self.max_tokens:
+                pieces.append(("".join(words).strip(), tokens))
+                words, tokens = [], 0
+            words.append(word)
+            tokens += word_tokens
+        if words:
+            pieces.append(("".join(words).strip(), tokens))
+        return pieces
@@ -1,9 +1,11 @@
 import os
+import threading
+import functools
+from typing import Callable, TypeVar
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from embedding_cache import CachedEmbeddings
 
 load_dotenv()
 
@@ -12,54 +14,106 @@ SUMMARY_INDEX_NAME = "sg-poc-summaries"
 CHUNK_INDEX_NAME = "sg-poc-chunks"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Validate OpenAI API key
-if not OPENAI_API_KEY:
-    raise ValueError("Missing OPENAI_API_KEY in .env")
+# "pinecone" or "local"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "./local_index")
 
-# Validate API key
-if not PINECONE_API_KEY:
-    raise ValueError("Missing PINECONE_API_KEY in .env")
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536  # Default dimension for text-embedding-3-small
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
+T = TypeVar("T")
 
-# Get all existing indexes
-existing_indexes = [index_info["name"] for index_info in pc.list_indexes()]
 
-# Validate that our indexes exist
-if SUMMARY_INDEX_NAME not in existing_indexes:
-    raise ValueError(f"Index '{SUMMARY_INDEX_NAME}' does not exist")
-if CHUNK_INDEX_NAME not in existing_indexes:
-    raise ValueError(f"Index '{CHUNK_INDEX_NAME}' does not exist")
+def lazy_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Turn a zero-argument factory into a thread-safe getter for a shared instance.
 
+    The factory runs on first call only. If it raises, nothing is cached and
+    the next call tries again, so a dependency that is down at startup does
+    not take the process with it.
+    """
+    lock = threading.Lock()
+    instance = []
 
+    @functools.wraps(factory)
+    def get() -> T:
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    get.is_initialized = lambda: bool(instance)
+    return get
+
+
+@lazy_singleton
+def get_pinecone_client():
+    """Get the Pinecone client, checking that both of our indexes exist."""
+    from pinecone import Pinecone
+
+    # Validate API key
+    if not PINECONE_API_KEY:
+        raise ValueError("Missing PINECONE_API_KEY in .env")
+
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+
+    # Validate that our indexes exist
+    existing_indexes = [index_info["name"] for index_info in pc.list_indexes()]
+    if SUMMARY_INDEX_NAME not in existing_indexes:
+        raise ValueError(f"Index '{SUMMARY_INDEX_NAME}' does not exist")
+    if CHUNK_INDEX_NAME not in existing_indexes:
+        raise ValueError(f"Index '{CHUNK_INDEX_NAME}' does not exist")
+
+    return pc
+
+
+@lazy_singleton
 def get_embedding() -> Embeddings:
-    """Get the OpenAI embedding model."""
-    return OpenAIEmbeddings(
-        model="text-embedding-3-small",
-        dimensions=1536,  # Default dimension for text-embedding-3-small
-        api_key=OPENAI_API_KEY,
+    """Get the OpenAI embedding model, wrapped in the shared query cache."""
+    from langchain_openai import OpenAIEmbeddings
+
+    # Validate OpenAI API key
+    if not OPENAI_API_KEY:
+        raise ValueError("Missing OPENAI_API_KEY in .env")
+
+    return CachedEmbeddings(
+        OpenAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            dimensions=EMBEDDING_DIMENSIONS,
+            api_key=OPENAI_API_KEY,
+            # Send as many inputs per request as the API allows
+            chunk_size=2048,
+        ),
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS,
     )
 
 
-# Create vector stores for both summary and chunks
-summary_index = pc.Index(SUMMARY_INDEX_NAME)
-chunk_index = pc.Index(CHUNK_INDEX_NAME)
+def create_vector_store(index_name: str, embedding: Embeddings) -> VectorStore:
+    """Open the named index on the backend selected by VECTOR_BACKEND."""
+    if VECTOR_BACKEND == "local":
+        from local_vector_store import LocalVectorStore
+
+        return LocalVectorStore(os.path.join(LOCAL_INDEX_DIR, index_name), embedding)
+
+    if VECTOR_BACKEND == "pinecone":
+        from langchain_pinecone import PineconeVectorStore
 
-# Use the same embedding model for both to ensure consistency
-embedding_model = get_embedding()
+        index = get_pinecone_client().Index(index_name)
+        return PineconeVectorStore(index=index, embedding=embedding)
 
-summary_vector_store = PineconeVectorStore(
-    index=summary_index, embedding=embedding_model
-)
-chunk_vector_store = PineconeVectorStore(index=chunk_index, embedding=embedding_model)
+    raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}'")
 
 
-def get_summary_vector_store():
+# Both stores use the same embedding model to ensure consistency
+@lazy_singleton
+def get_summary_vector_store() -> VectorStore:
     """Get the vector store for document summaries."""
-    return summary_vector_store
+    return create_vector_store(SUMMARY_INDEX_NAME, get_embedding())
 
 
-def get_chunk_vector_store():
+@lazy_singleton
+def get_chunk_vector_store() -> VectorStore:
     """Get the vector store for document chunks."""
-    return chunk_vector_store
+    return create_vector_store(CHUNK_INDEX_NAME, get_embedding())
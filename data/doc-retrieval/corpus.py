@@ -0,0 +1,133 @@
+import os
+import json
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Written by data_cleanup next to the cleaned files (see write_corpus there)
+CORPUS_INDEX_FILE = "corpus.index"
+CORPUS_FORMAT = 1
+# Bytes read at a time when scanning the corpus
+SCAN_BLOCK_SIZE = 1 << 20
+# How often to re-read the index when the data file it names was just replaced
+OPEN_ATTEMPTS = 3
+
+
+def corpus_signature(directory: str) -> Optional[Tuple[int, int]]:
+    """(mtime, size) of the corpus index in `directory`, or None if it has none."""
+    try:
+        stat = os.stat(os.path.join(directory, CORPUS_INDEX_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Corpus:
+    """
+    Reader for the consolidated corpus that data_cleanup writes next to the
+    cleaned files: one JSONL data file plus corpus.index, which lists every
+    document's file name, ID and byte range in it.
+
+    scan() reads the whole corpus in one sequential pass, and get() reads a
+    single document, by file name (with or without ".json") or ID, with one
+    seek. The index is read once on open, and every read goes through the
+    data file opened then, so a reader keeps working on its snapshot after
+    the corpus is rewritten and the old data file deleted.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        for attempt in range(OPEN_ATTEMPTS):
+            self.signature = corpus_signature(directory)
+            with open(
+                os.path.join(directory, CORPUS_INDEX_FILE), "r", encoding="utf-8"
+            ) as f:
+                index = json.load(f)
+            if index.get("format") != CORPUS_FORMAT:
+                raise ValueError(f"Unsupported corpus format {index.get('format')}")
+
+            self.data_path = os.path.join(directory, index["data"])
+            try:
+                self._file = open(self.data_path, "rb")
+                break
+            except FileNotFoundError:
+                # Rewritten between reading the index and opening its data;
+                # the new index names the new data file
+                if attempt + 1 == OPEN_ATTEMPTS:
+                    raise
+        self._lock = threading.Lock()
+
+        # (file name, document ID, offset, length), in file name order
+        self.entries: List[Tuple[str, Optional[str], int, int]] = [
+            tuple(entry) for entry in index["documents"]
+        ]
+        self._positions: Dict[str, int] = {}
+        for i, (name, doc_id, _, _) in enumerate(self.entries):
+            self._positions[name] = i
+            self._positions[os.path.splitext(name)[0]] = i
+            if doc_id is not None:
+                self._positions[str(doc_id)] = i
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def names(self) -> List[str]:
+        """File names of every document, in corpus order."""
+        return [entry[0] for entry in self.entries]
+
+    def get(self, key: str) -> Optional[dict]:
+        """Read one document by file name or ID, or None if it is unknown."""
+        position = self._positions.get(key)
+        if position is None:
+            return None
+        _, _, offset, length = self.entries[position]
+        return json.loads(self._line(self._read(offset, length), 0, length))
+
+    def scan(self) -> Iterator[Tuple[str, dict]]:
+        """Yield (file name, document) for every document, in corpus order."""
+        block, block_start = b"", 0
+        for name, _, offset, length in self.entries:
+            if offset + length > block_start + len(block):
+                block_start = offset
+                block = self._read(offset, max(length, SCAN_BLOCK_SIZE))
+            yield name, json.loads(self._line(block, offset - block_start, length))
+
+    def _read(self, offset: int, length: int) -> bytes:
+        """Read up to `length` bytes at `offset` of the data file opened with the index."""
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def _line(self, data: bytes, start: int, length: int) -> bytes:
+        line = data[start : start + length]
+        if len(line) < length:
+            raise ValueError(f"Corpus data file {self.data_path} is truncated")
+        return line
+
+    def close(self):
+        self._file.close()
+
+
+_corpora: Dict[str, Corpus] = {}
+_corpora_lock = threading.Lock()
+
+
+def get_corpus(directory: str) -> Optional[Corpus]:
+    """
+    Get a shared reader for the corpus in `directory`, reopened whenever the
+    corpus is rewritten, or None if the directory has no corpus.
+    """
+    signature = corpus_signature(directory)
+    with _corpora_lock:
+        corpus = _corpora.get(directory)
+        if corpus is not None and corpus.signature == signature:
+            return corpus
+        # An outdated reader may still be in use elsewhere; it closes when dropped
+        _corpora.pop(directory, None)
+        if signature is None:
+            return None
+        corpus = Corpus(directory)
+        _corpora[directory] = corpus
+        return corpus
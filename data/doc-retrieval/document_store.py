@@ -0,0 +1,230 @@
+import os
+import re
+import json
+import threading
+from typing import Dict, Any, Optional, Tuple
+from connection import lazy_singleton
+from corpus import Corpus, corpus_signature
+
+INPUT_DIR = "./cleaned_json"
+EXCERPT_LENGTH = 500
+RELOAD_INTERVAL = float(os.getenv("DOCUMENT_STORE_RELOAD_INTERVAL", "5"))
+
+METADATA_FIELDS = [
+    "id",
+    "version",
+    "long_title",
+    "short_title",
+    "sponsors",
+    "secondary_sponsors",
+    "first_reading",
+    "second_reading",
+    "result",
+    "session",
+]
+
+# Versions written by data_cleanup, in the order a bill passes through them;
+# the last four are final outcomes
+VERSIONS = [
+    "first_reading",
+    "second_reading",
+    "engrossed",
+    "officiated",
+    "vetoed",
+    "failed",
+    "unknown",
+]
+VERSION_SUFFIX_PATTERN = re.compile(r"_(" + "|".join(VERSIONS) + r")$")
+
+
+def split_version(doc_id: str) -> Tuple[str, Optional[str]]:
+    """Split a document ID like "sb_12_104_engrossed" into ("sb_12_104", "engrossed")."""
+    match = VERSION_SUFFIX_PATTERN.search(doc_id)
+    if match is None:
+        return doc_id, None
+    return doc_id[: match.start()], match.group(1)
+
+
+def make_excerpt(full_text: str) -> str:
+    """Build the short excerpt shown alongside a document summary."""
+    if len(full_text) > EXCERPT_LENGTH:
+        return full_text[:EXCERPT_LENGTH] + "..."
+    return full_text
+
+
+class DocumentStore:
+    """
+    In-memory view of the cleaned corpus.
+
+    Every file in `input_dir` is parsed once and kept in dictionaries keyed by
+    document ID, with metadata and excerpts precomputed, so lookups never touch
+    the disk. A background thread polls the directory and reloads only the
+    files whose size or modification time changed.
+
+    When cleanup wrote a consolidated corpus into the directory, it is read
+    in one sequential pass instead, and reloaded whenever it is rewritten.
+    """
+
+    def __init__(
+        self, input_dir: str = INPUT_DIR, reload_interval: float = RELOAD_INTERVAL
+    ):
+        self.input_dir = input_dir
+        self.reload_interval = reload_interval
+
+        self._lock = threading.Lock()
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+        self._corpus_signature: Optional[Tuple[int, int]] = None
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._excerpts: Dict[str, str] = {}
+        # Bumped on every reload that changed something
+        self.generation = 0
+
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self.reload()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._documents
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Return the full cleaned JSON for a document, or None."""
+        return self._documents.get(doc_id)
+
+    def get_metadata(self, doc_id: str) -> Dict[str, Any]:
+        """Return the metadata fields for a document, or {} if it is unknown."""
+        return dict(self._metadata.get(doc_id, {}))
+
+    def get_excerpt(self, doc_id: str) -> Optional[str]:
+        """Return the precomputed excerpt for a document, or None."""
+        return self._excerpts.get(doc_id)
+
+    def documents(self):
+        """Iterate over (file name, content) pairs of every loaded file."""
+        return list(self._files.items())
+
+    def reload(self) -> bool:
+        """
+        Re-scan the input directory and pick up added, changed and removed files.
+
+        Returns:
+            True if anything changed
+        """
+        with self._lock:
+            if not os.path.isdir(self.input_dir):
+                changed = bool(self._files)
+                if changed:
+                    self._signatures, self._files = {}, {}
+                    self._rebuild()
+                return changed
+
+            if corpus_signature(self.input_dir) is not None:
+                return self._reload_corpus()
+            self._corpus_signature = None
+
+            signatures = {}
+            with os.scandir(self.input_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        stat = entry.stat()
+                        signatures[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+            if signatures == self._signatures:
+                return False
+
+            files = {}
+            for name, signature in signatures.items():
+                if self._signatures.get(name) == signature and name in self._files:
+                    files[name] = self._files[name]
+                    continue
+                file_path = os.path.join(self.input_dir, name)
+                try:
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        files[name] = json.load(f)
+                except (OSError, ValueError) as e:
+                    # Most likely caught mid-write; retry on the next poll
+                    print(f"Error loading {file_path}: {e}")
+                    signature = None
+                    if name in self._files:
+                        files[name] = self._files[name]
+                signatures[name] = signature
+
+            self._signatures = signatures
+            self._files = files
+            self._rebuild()
+            return True
+
+    def _reload_corpus(self) -> bool:
+        if corpus_signature(self.input_dir) == self._corpus_signature:
+            return False
+        try:
+            corpus = Corpus(self.input_dir)
+            try:
+                files = dict(corpus.scan())
+            finally:
+                corpus.close()
+        except (OSError, ValueError) as e:
+            # Most likely caught mid-rewrite; retry on the next poll
+            print(f"Error loading corpus in {self.input_dir}: {e}")
+            return False
+
+        self._corpus_signature = corpus.signature
+        self._signatures = {}
+        self._files = files
+        self._rebuild()
+        return True
+
+    def _rebuild(self):
+        documents, metadata, excerpts = {}, {}, {}
+        for name, content in self._files.items():
+            doc_metadata = {field: content.get(field) for field in METADATA_FIELDS}
+            excerpt = make_excerpt(content.get("full_text", ""))
+
+            # Look-ups have always been by file name; the cleaned ID is the
+            # lowercased form of it, so register both.
+            keys = {os.path.splitext(name)[0]}
+            if content.get("id") is not None:
+                keys.add(str(content["id"]))
+            for key in keys:
+                documents[key] = content
+                metadata[key] = doc_metadata
+                excerpts[key] = excerpt
+
+        # Swap whole dictionaries so readers never see a half-built view
+        self._documents = documents
+        self._metadata = metadata
+        self._excerpts = excerpts
+        self.generation += 1
+
+    def start_watcher(self):
+        """Start polling the input directory for changes in the background."""
+        if self._watcher is not None or self.reload_interval <= 0:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, name="document-store-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                if self.reload():
+                    print(f"Reloaded document store ({len(self)} files)")
+            except Exception as e:
+                print(f"Error reloading document store: {e}")
+
+
+@lazy_singleton
+def get_document_store() -> DocumentStore:
+    """Get the shared document store, loading the corpus on first use."""
+    store = DocumentStore()
+    store.start_watcher()
+    return store
@@ -0,0 +1,184 @@
+import os
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Dict
+from langchain_core.embeddings import Embeddings
+from embedding_store import EmbeddingStore
+from metrics import span, count_cache
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+# Shared with the indexer; set to an empty string to keep vectors in memory only
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "./embedding_store")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a key."""
+    return " ".join(text.lower().split())
+
+
+def cache_key(model: str, dimensions: Optional[int], text: str) -> bytes:
+    """Content address of the vector `model` produces for exactly `text`."""
+    payload = f"{model}\x00{dimensions}\x00{text}"
+    return hashlib.sha256(payload.encode("utf-8")).digest()
+
+
+def query_key(model: str, dimensions: Optional[int], text: str) -> bytes:
+    """Key of a query's vector, apart from any document with the same text."""
+    return cache_key(model, dimensions, f"query\x00{normalize_text(text)}")
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that answers repeated texts from a cache.
+
+    Vectors are looked up in a bounded in-process LRU first, then in the
+    on-disk embedding store, and only texts missing from both are sent to
+    the wrapped model (in a single batch). Keys cover the model name, the
+    output dimensions and the text.
+
+    The store lives next to the indexes and is shared by the indexer's
+    summary and chunk paths, so text that was embedded once (overlapping
+    chunks, clauses repeated across versions, an unchanged corpus on
+    reindex) is never paid for again.
+
+    Queries are normalized, and the normalized text is what gets embedded,
+    so trivially different phrasings share a vector. Their keys are kept
+    apart from documents' and they only go in the LRU, never the store, so
+    user queries don't grow it without bound.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        dimensions: Optional[int] = None,
+        max_size: int = EMBEDDING_CACHE_SIZE,
+        store_dir: Optional[str] = EMBEDDING_STORE_DIR,
+    ):
+        self.embeddings = embeddings
+        self.model = model
+        self.dimensions = dimensions
+        self.max_size = max_size
+        self.disk = (
+            EmbeddingStore(os.path.join(store_dir, f"{model}-{dimensions}"), dimensions)
+            if store_dir and dimensions
+            else None
+        )
+
+        self._lru: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._lru),
+        }
+
+    def _remember(self, key: bytes, vector: List[float]):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, keys: List[bytes], persist: bool = True):
+        vectors: List[Optional[List[float]]] = [None] * len(keys)
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    vectors[i] = vector
+                    self.hits += 1
+                    count_cache("embedding", "hit")
+
+        if persist and self.disk is not None:
+            pending = [keys[i] for i, vector in enumerate(vectors) if vector is None]
+            found = self.disk.get_many(pending)
+            if found:
+                with self._lock:
+                    for i, key in enumerate(keys):
+                        if vectors[i] is None and key in found:
+                            vectors[i] = found[key]
+                            self._remember(key, found[key])
+                            self.disk_hits += 1
+                            count_cache("embedding", "disk_hit")
+
+        # Embed each distinct missing text once, even if repeated in the batch
+        missing: Dict[bytes, int] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None and keys[i] not in missing:
+                missing[keys[i]] = i
+        return vectors, missing
+
+    def _store(self, keys, vectors, missing, new_vectors, persist: bool = True):
+        new_items = dict(zip(missing, new_vectors))
+        with self._lock:
+            self.misses += len(new_items)
+            count_cache("embedding", "miss", len(new_items))
+            for key, vector in new_items.items():
+                self._remember(key, vector)
+        for i, key in enumerate(keys):
+            if vectors[i] is None:
+                vectors[i] = new_items[key]
+        if persist and self.disk is not None:
+            self.disk.put_many(new_items)
+        return vectors
+
+    def _keys(self, texts: List[str]) -> List[bytes]:
+        return [cache_key(self.model, self.dimensions, text) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        vectors, missing = self._lookup(keys)
+        new_vectors = []
+        if missing:
+            with span("embed_api"):
+                new_vectors = self.embeddings.embed_documents(
+                    [texts[i] for i in missing.values()]
+                )
+        return self._store(keys, vectors, missing, new_vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        keys = [query_key(self.model, self.dimensions, text)]
+        vectors, missing = self._lookup(keys, persist=False)
+        new_vectors = []
+        if missing:
+            with span("embed_api"):
+                new_vectors = [self.embeddings.embed_query(normalize_text(text))]
+        return self._store(keys, vectors, missing, new_vectors, persist=False)[0]
+
+    async def _offload(self, func, *args):
+        # Only the disk store does blocking I/O; LRU-only look-ups stay inline
+        if self.disk is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        vectors, missing = await self._offload(self._lookup, keys)
+        new_vectors = []
+        if missing:
+            with span("embed_api"):
+                new_vectors = await self.embeddings.aembed_documents(
+                    [texts[i] for i in missing.values()]
+                )
+        return await self._offload(self._store, keys, vectors, missing, new_vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # Queries stay in memory, so there is no I/O to offload
+        keys = [query_key(self.model, self.dimensions, text)]
+        vectors, missing = self._lookup(keys, persist=False)
+        new_vectors = []
+        if missing:
+            with span("embed_api"):
+                new_vectors = [await self.embeddings.aembed_query(normalize_text(text))]
+        return self._store(keys, vectors, missing, new_vectors, persist=False)[0]
@@ -0,0 +1,120 @@
+import os
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+RECORD_SIZE = 40  # 32-byte sha256 digest + uint64 row number
+
+
+class EmbeddingStore:
+    """
+    Append-only, content-addressed store of embedding vectors on disk.
+
+    Vectors live in a flat float32 file (vectors.f32), one row each, and
+    index.bin maps each key digest to its row. The whole index is read into
+    memory on open, so a look-up is one dict access plus one row read.
+
+    Several processes can share a store: appends take an exclusive file lock
+    where the platform has one, and readers pick up rows added by others
+    when they next miss. A vector is written before its index record, so a
+    crash can at worst leave an unreferenced row behind.
+    """
+
+    def __init__(self, path: str, dimensions: int):
+        self.path = path
+        self.dimensions = dimensions
+        self.row_bytes = dimensions * 4
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._index_offset = 0
+        self._vectors = open(os.path.join(path, "vectors.f32"), "a+b")
+        self._index = open(os.path.join(path, "index.bin"), "a+b")
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _refresh(self):
+        """Read index records appended since the last refresh."""
+        self._index.seek(self._index_offset)
+        data = self._index.read()
+        complete = len(data) - len(data) % RECORD_SIZE
+        if not complete:
+            return
+        vector_rows = os.fstat(self._vectors.fileno()).st_size // self.row_bytes
+        for offset in range(0, complete, RECORD_SIZE):
+            row = int.from_bytes(data[offset + 32 : offset + RECORD_SIZE], "little")
+            if row < vector_rows:
+                self._rows[data[offset : offset + 32]] = row
+        self._index_offset += complete
+
+    def get_many(self, digests: List[bytes]) -> Dict[bytes, List[float]]:
+        found = {}
+        with self._lock:
+            if any(digest not in self._rows for digest in digests):
+                self._refresh()
+            for digest in digests:
+                row = self._rows.get(digest)
+                if row is None:
+                    continue
+                self._vectors.seek(row * self.row_bytes)
+                found[digest] = np.frombuffer(
+                    self._vectors.read(self.row_bytes), dtype="<f4"
+                ).tolist()
+        return found
+
+    def put_many(self, items: Dict[bytes, List[float]]):
+        if not items:
+            return
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._index.fileno(), fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                # Drop any partial record left by a writer that died mid-append
+                self._index.truncate(self._index_offset)
+                items = {d: v for d, v in items.items() if d not in self._rows}
+                if not items:
+                    return
+                matrix = np.asarray(list(items.values()), dtype="<f4")
+                if matrix.shape[1] != self.dimensions:
+                    raise ValueError(
+                        f"Expected {self.dimensions}-dimensional vectors, got {matrix.shape[1]}"
+                    )
+
+                # Align to whole rows in case a previous writer died mid-row
+                size = os.fstat(self._vectors.fileno()).st_size
+                first_row = -(-size // self.row_bytes)
+                self._vectors.truncate(first_row * self.row_bytes)
+                self._vectors.seek(0, os.SEEK_END)
+                self._vectors.write(matrix.tobytes())
+                self._vectors.flush()
+
+                rows = {digest: first_row + i for i, digest in enumerate(items)}
+                self._index.seek(0, os.SEEK_END)
+                self._index.write(
+                    b"".join(
+                        digest + row.to_bytes(8, "little")
+                        for digest, row in rows.items()
+                    )
+                )
+                self._index.flush()
+                self._index_offset = self._index.tell()
+                self._rows.update(rows)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._index.fileno(), fcntl.LOCK_UN)
+
+    def close(self):
+        with self._lock:
+            self._vectors.close()
+            self._index.close()
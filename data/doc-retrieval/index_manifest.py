@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+from typing import Dict, Iterator, List, Optional, Set
+
+INDEX_MANIFEST_FILE = os.getenv("INDEX_MANIFEST_FILE", "./index_manifest.json")
+
+
+def content_hash(*parts) -> str:
+    """Stable sha256 of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    Record of what is currently in the vector stores, one entry per bill.
+
+    Each entry stores a hash of everything that determines the bill's
+    vectors (its cleaned content, which version file was chosen and the
+    indexing config), plus the vector IDs written for it. Comparing hashes
+    tells the indexer which bills need redoing, and the stored IDs let it
+    delete vectors that are no longer produced.
+    """
+
+    def __init__(self, path: str = INDEX_MANIFEST_FILE):
+        self.path = path
+        self.bills: Dict[str, dict] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.bills = json.load(f).get("bills", {})
+        except FileNotFoundError:
+            pass
+
+    def is_current(self, key: str, digest: str) -> bool:
+        entry = self.bills.get(key)
+        return entry is not None and entry["hash"] == digest
+
+    def recorded_hash(self, key: str) -> Optional[str]:
+        entry = self.bills.get(key)
+        return entry["hash"] if entry is not None else None
+
+    def vector_ids(self, key: str) -> Dict[str, List[str]]:
+        """Get the summary and chunk IDs recorded for a bill."""
+        entry = self.bills.get(key, {})
+        return {
+            "summary_ids": list(entry.get("summary_ids", [])),
+            "chunk_ids": list(entry.get("chunk_ids", [])),
+        }
+
+    def record(
+        self, key: str, digest: str, summary_ids: List[str], chunk_ids: List[str]
+    ):
+        self.bills[key] = {
+            "hash": digest,
+            "summary_ids": list(summary_ids),
+            "chunk_ids": list(chunk_ids),
+        }
+
+    def remove(self, key: str):
+        self.bills.pop(key, None)
+
+    def missing(self, seen_keys) -> Iterator[str]:
+        """Keys recorded in the manifest but absent from `seen_keys`."""
+        return (key for key in list(self.bills) if key not in seen_keys)
+
+    def live_ids(self) -> Set[str]:
+        """Every vector ID recorded for any bill."""
+        return {
+            vector_id
+            for entry in self.bills.values()
+            for field in ("summary_ids", "chunk_ids")
+            for vector_id in entry.get(field, [])
+        }
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"bills": self.bills}, f)
+        os.replace(tmp_path, self.path)
+
+
+def stale_ids(old_ids: List[str], new_ids: Optional[List[str]] = None) -> List[str]:
+    """IDs written previously that a new set of vectors does not overwrite."""
+    keep = set(new_ids or [])
+    return [vector_id for vector_id in old_ids if vector_id not in keep]
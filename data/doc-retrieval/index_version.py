@@ -0,0 +1,34 @@
+import os
+import json
+import time
+import uuid
+from typing import Optional
+
+INDEX_VERSION_FILE = os.getenv("INDEX_VERSION_FILE", "./index_version.json")
+
+
+def publish_index_version(path: str = INDEX_VERSION_FILE) -> str:
+    """
+    Record that a new index has been published.
+
+    Anything derived from the previous index (such as cached search results)
+    should be considered stale once the version changes.
+
+    Returns:
+        The new version string
+    """
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "published_at": time.time()}, f)
+    os.replace(tmp_path, path)
+    return version
+
+
+def read_index_version(path: str = INDEX_VERSION_FILE) -> Optional[str]:
+    """Get the currently published index version, or None if none was recorded."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("version")
+    except (OSError, ValueError):
+        return None
@@ -1,15 +1,84 @@
 import os
 import json
+import math
 import time
+import hashlib
+import argparse
+from collections import deque
+from itertools import groupby, islice
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from langchain_core.documents import Document
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import StrOutputParser
-from connection import get_summary_vector_store, get_chunk_vector_store
-from collections import defaultdict
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from connection import (
+    lazy_singleton,
+    get_embedding,
+    get_summary_vector_store,
+    get_chunk_vector_store,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSIONS,
+)
+from index_manifest import IndexManifest, content_hash, stale_ids
+from index_version import publish_index_version
+from chunking import ClauseChunker, CLAUSE_CHUNK_TOKENS
+from corpus import get_corpus
+from document_store import VERSIONS, split_version
+from embedding_cache import EMBEDDING_STORE_DIR, cache_key
+from embedding_store import EmbeddingStore
+from pipeline import background, process_map
+from planning import (
+    EMBED_LATENCY,
+    EMBEDDING_PRICE,
+    SUMMARY_INPUT_PRICE,
+    SUMMARY_LATENCY,
+    SUMMARY_OUTPUT_PRICE,
+    UPSERT_LATENCY,
+    print_plan,
+    request_count,
+    stage_seconds,
+    token_cost,
+)
+from rate_limiting import AdaptiveRateLimiter, count_tokens
+from summarization import (
+    EXPECTED_OUTPUT_TOKENS,
+    SUMMARY_CONCURRENCY,
+    SUMMARY_RPM,
+    SUMMARY_TPM,
+    Summarizer,
+    SummaryCheckpoint,
+    make_openai_llm,
+)
+from upserts import (
+    DELETE_BATCH_SIZE,
+    EMBED_BATCH_TOKENS,
+    EMBEDDING_RPM,
+    EMBEDDING_TPM,
+    UPSERT_CONCURRENCY,
+    UPSERT_MAX_BYTES,
+    UPSERT_MAX_VECTORS,
+    UPSERT_RPM,
+    UpsertScheduler,
+    payload_bytes,
+)
 
 INPUT_DIR = "./cleaned_json"
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_PROMPT = 'Summarize the following document ({leg_name}):\n\n{doc}. Start with "This document, {leg_name}, or {full_leg_name}), ...".'
+# Bills buffered between pipeline stages; this, not the corpus size, bounds memory
+QUEUE_SIZE = 8
+# How many re-indexed bills to record between manifest saves
+MANIFEST_SAVE_INTERVAL = 25
+# Processes loading and splitting bills, and bills handed to one at a time
+PREPARE_WORKERS = int(os.getenv("PREPARE_WORKERS", str(os.cpu_count() or 1)))
+PREPARE_BATCH_SIZE = 4
+
+BILL_TYPE_MAP = {
+    "SB": "Senate Bill",
+    "R": "Resolution",
+    "FB": "Finance Bill",
+    "GB": "Government Bill",
+    "AB": "Appropriations Bill",
+    "BB": "Budget Bill",
+    "SR-A": "Senate Resolution",
+}
 
 
 def get_file_priority(filename):
@@ -23,143 +92,584 @@ def get_file_priority(filename):
         return 4
 
 
-def index_documents():
-    summary_vector_store = get_summary_vector_store()
-    chunk_vector_store = get_chunk_vector_store()
+def get_bill_key(filename: str) -> str:
+    """Group key for a cleaned file: its document ID without the version."""
+    return split_version(os.path.splitext(filename)[0].lower())[0]
+
+
+def version_order(filename: str) -> int:
+    _, version = split_version(os.path.splitext(filename)[0].lower())
+    return VERSIONS.index(version) if version in VERSIONS else len(VERSIONS)
+
+
+def iter_bill_files(input_dir: str = INPUT_DIR) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield (bill key, file names) for each bill, in a stable order.
+
+    A bill's files are ordered by version, from first reading to final outcome.
+    Files are listed from the consolidated corpus when cleanup wrote one.
+    """
+    corpus = get_corpus(input_dir)
+    names = corpus.names() if corpus is not None else os.listdir(input_dir)
+    files = sorted((get_bill_key(f), f) for f in names if f.endswith(".json"))
+    for key, group in groupby(files, key=lambda x: x[0]):
+        yield key, sorted((file for _, file in group), key=version_order)
+
+
+def load_bill(key: str, files: List[str], input_dir: str = INPUT_DIR) -> dict:
+    """Load every version of a bill, from the corpus if there is one."""
+    corpus = get_corpus(input_dir)
+    contents = []
+    for file in files:
+        content = corpus.get(file) if corpus is not None else None
+        if content is not None:
+            contents.append(content)
+            continue
+        with open(os.path.join(input_dir, file), "r", encoding="utf-8") as f:
+            contents.append(json.load(f))
+    preferred = min(range(len(files)), key=lambda i: get_file_priority(files[i]))
+    return {
+        "key": key,
+        "files": files,
+        "contents": contents,
+        "preferred": preferred,
+    }
+
+
+def index_config() -> dict:
+    """Settings that change the vectors produced for a bill when they change."""
+    return {
+        # Bump when the metadata written with the vectors changes, so every
+        # bill is re-indexed; 2 stores chunks once per bill with their
+        # doc_ids, bill and versions instead of one doc_id per version
+        "schema": 2,
+        "chunker": "clauses",
+        "chunk_tokens": CLAUSE_CHUNK_TOKENS,
+        "summary_model": SUMMARY_MODEL,
+        "summary_prompt": SUMMARY_PROMPT,
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_dimensions": EMBEDDING_DIMENSIONS,
+    }
+
+
+def get_legislative_names(bill_id: str) -> Tuple[str, str]:
+    """Get the short and long legislative names for a bill, e.g. SB_12 and Senate Bill 12."""
+    name = "_".join(bill_id.split("_")[0:2]).upper()
+    prefix, number = name.split("_")
+    return name, f"{BILL_TYPE_MAP.get(prefix, prefix)} {number}"
 
-    bill_files = defaultdict(list)
 
-    for file in os.listdir(INPUT_DIR):
-        file_path = os.path.join(INPUT_DIR, file)
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = json.load(f)
+def prepare_bill(
+    key: str, contents: List[dict], preferred: int, chunker: ClauseChunker
+) -> dict:
+    """
+    Build the metadata and chunk documents for one bill.
 
-        bill_id = str(content["id"])
-        priority = get_file_priority(file)
+    The summary describes the preferred version. Chunks are built for every
+    version, but a chunk whose text appears in several versions is stored
+    once, under an ID derived from its text, listing the versions (and their
+    document IDs) it belongs to. Only text that changed between readings
+    adds vectors.
+    """
+    content = contents[preferred]
+    bill_id = str(content["id"])
+    versions = [str(c["version"]) for c in contents]
 
-        bill_files[bill_id].append((priority, file_path, content))
+    metadata = {
+        "id": str(content["id"]),
+        "version": str(content["version"]),
+        "long_title": str(content["long_title"]),
+        "short_title": str(content["short_title"]),
+        "sponsors": str(content["sponsors"]),
+        "secondary_sponsors": str(content["secondary_sponsors"]),
+        "first_reading": str(content["first_reading"]),
+        "second_reading": str(content["second_reading"]),
+        "result": str(content["result"]),
+        "session": str(content["session"]),
+        "versions": versions,
+    }
+
+    # Chunk text digest -> chunk, in order of first appearance
+    chunks: Dict[str, dict] = {}
+    for version_content in contents:
+        for chunk in chunker.split(version_content):
+            digest = hashlib.sha256(chunk["text"].encode("utf-8")).hexdigest()[:16]
+            entry = chunks.setdefault(digest, {**chunk, "versions": [], "doc_ids": []})
+            if str(version_content["version"]) not in entry["versions"]:
+                entry["versions"].append(str(version_content["version"]))
+                entry["doc_ids"].append(str(version_content["id"]))
 
-    summary_docs = []
     chunk_docs = []
-    summary_ids = []
     chunk_ids = []
+    for i, (digest, chunk) in enumerate(chunks.items()):
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-    )
-
-    for i, (bill_id, file_list) in enumerate(bill_files.items()):
-        if i >= 5:
-            break
-
-        file_list.sort(key=lambda x: x[0])
-        _, file_path, content = file_list[0]
-
-        metadata = {
-            "id": str(content["id"]),
-            "version": str(content["version"]),
-            "long_title": str(content["long_title"]),
-            "short_title": str(content["short_title"]),
-            "sponsors": str(content["sponsors"]),
-            "secondary_sponsors": str(content["secondary_sponsors"]),
-            "first_reading": str(content["first_reading"]),
-            "second_reading": str(content["second_reading"]),
-            "result": str(content["result"]),
-            "session": str(content["session"]),
-        }
-
-        summary_doc = Document(
-            metadata=metadata,
-            page_content=content["full_text"],
-        )
-        summary_docs.append(summary_doc)
-        summary_ids.append(bill_id)
+        chunk_metadata = metadata.copy()
+        chunk_metadata["chunk_id"] = i
+        chunk_metadata["total_chunks"] = len(chunks)
+        chunk_metadata["doc_id"] = bill_id
+        chunk_metadata["bill"] = key
+        chunk_metadata["versions"] = chunk["versions"]
+        chunk_metadata["doc_ids"] = chunk["doc_ids"]
+        chunk_metadata["clause_type"] = chunk["clause_type"]
+        chunk_metadata["clause_start"] = chunk["clause_start"]
+        chunk_metadata["clause_end"] = chunk["clause_end"]
 
-        chunks = text_splitter.split_text(content["full_text"])
-        for i, chunk_text in enumerate(chunks):
+        chunk_doc = Document(
+            metadata=chunk_metadata,
+            page_content=chunk["text"],
+        )
+        chunk_docs.append(chunk_doc)
+        chunk_ids.append(f"{key}_chunk_{digest}")
 
-            chunk_metadata = metadata.copy()
-            chunk_metadata["chunk_id"] = i
-            chunk_metadata["total_chunks"] = len(chunks)
-            chunk_metadata["doc_id"] = bill_id
+    leg_name, full_leg_name = get_legislative_names(bill_id)
 
-            chunk_doc = Document(
-                metadata=chunk_metadata,
-                page_content=chunk_text,
-            )
-            chunk_docs.append(chunk_doc)
-            chunk_ids.append(f"{bill_id}_chunk_{i}")
-
-    legislative_names = [
-        "_".join(doc.metadata["id"].split("_")[0:2]).upper() for doc in summary_docs
-    ]
-
-    bill_type_map = {
-        "SB": "Senate Bill",
-        "R": "Resolution",
-        "FB": "Finance Bill",
-        "GB": "Government Bill",
-        "AB": "Appropriations Bill",
-        "BB": "Budget Bill",
-        "SR-A": "Senate Resolution",
+    return {
+        "bill_id": bill_id,
+        "metadata": metadata,
+        "full_text": content["full_text"],
+        "leg_name": leg_name,
+        "full_leg_name": full_leg_name,
+        "chunk_docs": chunk_docs,
+        "chunk_ids": chunk_ids,
+        "chunk_tokens": [chunk["tokens"] for chunk in chunks.values()],
     }
 
-    full_legislative_names = []
-    for name in legislative_names:
-        prefix, number = name.split("_")
-        full_name = f"{bill_type_map.get(prefix, prefix)} {number}"
-        full_legislative_names.append(full_name)
-
-    chain = (
-        {
-            "doc": lambda x: x.page_content,
-            "leg_name": lambda x: legislative_names[summary_docs.index(x)],
-            "full_leg_name": lambda x: full_legislative_names[summary_docs.index(x)],
-        }
-        | ChatPromptTemplate.from_template(
-            'Summarize the following document ({leg_name}):\n\n{doc}. Start with "This document, {leg_name}, or {full_leg_name}), ...".'
-        )
-        | ChatOpenAI(model="gpt-4o-mini", max_retries=0)
-        | StrOutputParser()
+
+@lazy_singleton
+def get_chunker() -> ClauseChunker:
+    return ClauseChunker()
+
+
+def load_and_prepare_bill(task: Tuple[str, List[str], Optional[str], str]) -> dict:
+    """
+    Load a bill, hash it and, if the hash differs from the recorded one,
+    prepare it. Runs in a worker process.
+
+    Args:
+        task: (bill key, file names, hash recorded in the manifest or None to
+            always prepare, input directory)
+
+    Returns:
+        The prepared bill, or just its key and hash with "changed" False
+    """
+    key, files, recorded_hash, input_dir = task
+    bill = load_bill(key, files, input_dir)
+    bill["hash"] = content_hash(
+        content_hash(index_config()), bill["files"], bill["contents"]
     )
+    if bill["hash"] == recorded_hash:
+        return {"key": key, "hash": bill["hash"], "changed": False}
 
-    summaries = chain.batch(summary_docs, batch_size=5)
-    print("\n\n\nSUMMARIES:\n")
-    print(summaries)
+    bill.update(
+        prepare_bill(key, bill.pop("contents"), bill["preferred"], get_chunker())
+    )
+    bill["changed"] = True
+    return bill
 
-    for i in range(len(summary_docs)):
-        summary_docs[i] = Document(
-            page_content=summaries[i], metadata=summary_docs[i].metadata
-        )
 
-    print(f"Indexing {len(summary_docs)} document summaries...")
-    for i in range(0, len(summary_docs), 10):
-        batch_docs = summary_docs[i : i + 10]
-        batch_ids = summary_ids[i : i + 10]
-        summary_vector_store.add_documents(documents=batch_docs, ids=batch_ids)
-        if i + 10 < len(summary_docs):
+def prepare_changed_bills(
+    bill_files: Iterator[Tuple[str, List[str]]],
+    manifest: IndexManifest,
+    seen: Set[str],
+    force: bool = False,
+    workers: int = PREPARE_WORKERS,
+    input_dir: str = INPUT_DIR,
+) -> Iterator[dict]:
+    """
+    Load, hash and prepare bills on a pool of worker processes, yielding only
+    the bills whose versions, their content or the indexing config differ
+    from what the manifest recorded, in input order. Every key read is added
+    to `seen`.
+
+    JSON parsing, splitting, token counting and building chunk metadata and
+    IDs are all CPU-bound, so they scale with `workers`; the caller only sees
+    finished bills.
+    """
+    tasks = (
+        (key, files, None if force else manifest.recorded_hash(key), input_dir)
+        for key, files in bill_files
+    )
+    for bill in process_map(load_and_prepare_bill, tasks, workers, PREPARE_BATCH_SIZE):
+        seen.add(bill["key"])
+        if bill.pop("changed"):
+            yield bill
+
+
+def summary_request(bill: dict) -> Tuple[str, str, dict]:
+    """Checkpoint key, content hash and prompt inputs for a bill's summary."""
+    inputs = {
+        "doc": bill["full_text"],
+        "leg_name": bill["leg_name"],
+        "full_leg_name": bill["full_leg_name"],
+    }
+    return bill["key"], bill["hash"], inputs
+
+
+def summarize_bills(bills: Iterator[dict], summarizer: Summarizer) -> Iterator[dict]:
+    """Attach a summary document to each prepared bill, keeping input order."""
+
+    for i, (bill, summary) in enumerate(
+        summarizer.map(bills, summary_request), start=1
+    ):
+        if i % 10 == 0:
             print(
-                f"Indexed {i+10}/{len(summary_docs)} summaries, sleeping to respect rate limits..."
+                f"Summarized {i} documents ({summarizer.resumed} from checkpoint, "
+                f"{summarizer.retries} retries)"
             )
-            time.sleep(1)
-
-    print(f"Indexing {len(chunk_docs)} document chunks...")
-    for i in range(0, len(chunk_docs), 10):
-        batch_docs = chunk_docs[i : i + 10]
-        batch_ids = chunk_ids[i : i + 10]
-        chunk_vector_store.add_documents(documents=batch_docs, ids=batch_ids)
-        if i + 10 < len(chunk_docs):
-            print(
-                f"Indexed {i+10}/{len(chunk_docs)} chunks, sleeping to respect rate limits..."
+        bill["summary_doc"] = Document(page_content=summary, metadata=bill["metadata"])
+        yield bill
+
+
+def index_documents(
+    limit: Optional[int] = None,
+    force: bool = False,
+    concurrency: int = SUMMARY_CONCURRENCY,
+    requests_per_minute: int = SUMMARY_RPM,
+    tokens_per_minute: int = SUMMARY_TPM,
+    workers: int = PREPARE_WORKERS,
+):
+    """
+    Summarize, chunk, embed and index new or changed bills in the cleaned corpus.
+
+    Bills stream through loading/splitting, summarization and upserting,
+    each stage in its own thread with a bounded queue in between, so the
+    stages overlap and memory use does not grow with the corpus. Loading and
+    splitting run on a pool of worker processes, embedding and upserts on a
+    thread pool per vector store (see upserts.py).
+
+    The index manifest records a content hash per bill, so bills that have
+    not changed since the last run are skipped without any API calls, and
+    vectors of bills that have disappeared from the corpus are deleted.
+
+    Args:
+        limit: Optional maximum number of bills to read. Removed bills are
+            only detected on full runs.
+        force: Re-index every bill even if the manifest says it is current
+        concurrency: Summary requests in flight
+        requests_per_minute: Starting summary request rate limit
+        tokens_per_minute: Starting summary token rate limit
+        workers: Processes loading and splitting bills
+    """
+    manifest = IndexManifest()
+    checkpoint = SummaryCheckpoint()
+    summarizer = Summarizer(
+        make_openai_llm(SUMMARY_MODEL),
+        SUMMARY_PROMPT,
+        concurrency=concurrency,
+        limiter=AdaptiveRateLimiter(requests_per_minute, tokens_per_minute),
+        checkpoint=checkpoint,
+    )
+    seen: Set[str] = set()
+
+    bill_files = iter_bill_files(INPUT_DIR)
+    if limit is not None:
+        bill_files = islice(bill_files, limit)
+
+    prepared = background(
+        prepare_changed_bills(bill_files, manifest, seen, force, workers),
+        QUEUE_SIZE,
+        "prepare",
+    )
+    summarized = background(
+        summarize_bills(prepared, summarizer), QUEUE_SIZE, "summarize"
+    )
+
+    summaries = UpsertScheduler(get_summary_vector_store, get_embedding, "summaries")
+    chunks = UpsertScheduler(get_chunk_vector_store, get_embedding, "chunks")
+
+    # A bill is recorded in the manifest only once all of its vectors have
+    # been written, so an interrupted run redoes it next time.
+    pending = deque()
+    updated = 0
+    unsaved = 0
+
+    def record_written() -> int:
+        recorded = 0
+        while (
+            pending
+            and pending[0][0] <= summaries.indexed
+            and pending[0][1] <= chunks.indexed
+        ):
+            _, _, key, digest, summary_ids, chunk_ids = pending.popleft()
+            manifest.record(key, digest, summary_ids, chunk_ids)
+            recorded += 1
+        return recorded
+
+    try:
+        for bill in summarized:
+            previous = manifest.vector_ids(bill["key"])
+            summaries.delete(stale_ids(previous["summary_ids"], [bill["bill_id"]]))
+            chunks.delete(stale_ids(previous["chunk_ids"], bill["chunk_ids"]))
+
+            summaries.add([bill["summary_doc"]], [bill["bill_id"]])
+            chunks.add(bill["chunk_docs"], bill["chunk_ids"], bill["chunk_tokens"])
+            pending.append(
+                (
+                    summaries.added,
+                    chunks.added,
+                    bill["key"],
+                    bill["hash"],
+                    [bill["bill_id"]],
+                    bill["chunk_ids"],
+                )
             )
-            time.sleep(1)
 
+            recorded = record_written()
+            updated += recorded
+            unsaved += recorded
+            if unsaved >= MANIFEST_SAVE_INTERVAL:
+                manifest.save()
+                unsaved = 0
+
+        summaries.flush()
+        chunks.flush()
+        updated += record_written()
+
+        removed = 0
+        if limit is None:
+            orphaned = {"summary_ids": [], "chunk_ids": []}
+            for key in list(manifest.missing(seen)):
+                for field, ids in manifest.vector_ids(key).items():
+                    orphaned[field].extend(ids)
+                manifest.remove(key)
+                removed += 1
+            # A removed entry can share IDs with a current one, e.g. when a
+            # bill's versions used to be indexed as separate documents
+            live = manifest.live_ids()
+            summaries.delete([i for i in orphaned["summary_ids"] if i not in live])
+            chunks.delete([i for i in orphaned["chunk_ids"] if i not in live])
+    finally:
+        summaries.close()
+        chunks.close()
+
+    # Everything summarized has been indexed and recorded in the manifest
+    checkpoint.clear()
+
+    if not updated and not removed:
+        print(f"Index is up to date ({len(seen)} bills unchanged)")
+        return
+
+    manifest.save()
     print(
-        f"Successfully indexed {len(summary_docs)} documents with {len(chunk_docs)} total chunks"
+        f"Successfully indexed {updated} new or changed documents with {chunks.indexed} total chunks, "
+        f"removed {removed} documents, {len(seen) - updated} unchanged"
     )
 
+    version = publish_index_version()
+    print(f"Published index version {version}")
+
+
+def plan_index(
+    limit: Optional[int] = None,
+    force: bool = False,
+    concurrency: int = SUMMARY_CONCURRENCY,
+    requests_per_minute: int = SUMMARY_RPM,
+    tokens_per_minute: int = SUMMARY_TPM,
+    workers: int = PREPARE_WORKERS,
+) -> dict:
+    """
+    Estimate what index_documents would do, without calling any API.
+
+    Runs the real loading, change detection, version selection and splitting,
+    and counts tokens with tiktoken (estimating them offline, see
+    count_tokens). Summaries already in the checkpoint and
+    texts already in the embedding store are counted as free, as they would
+    be on a real run. Durations are projected from the rate limits, the
+    concurrency and typical request latencies (see planning.py); the
+    pipeline overlaps its stages, so the total is that of the slowest one.
+
+    Takes the same arguments as index_documents.
+    """
+    manifest = IndexManifest()
+    checkpoint = SummaryCheckpoint()
+    store_path = os.path.join(
+        EMBEDDING_STORE_DIR, f"{EMBEDDING_MODEL}-{EMBEDDING_DIMENSIONS}"
+    )
+    store = (
+        EmbeddingStore(store_path, EMBEDDING_DIMENSIONS)
+        if EMBEDDING_STORE_DIR and os.path.isdir(store_path)
+        else None
+    )
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    seen: Set[str] = set()
+
+    bill_files = iter_bill_files(INPUT_DIR)
+    if limit is not None:
+        bill_files = islice(bill_files, limit)
+
+    changed = chunks = 0
+    summary_requests = input_tokens = output_tokens = 0
+    texts = cached = embed_tokens = 0
+    vectors = upsert_size = deletes = delete_requests = 0
+
+    started = time.monotonic()
+    for bill in prepare_changed_bills(bill_files, manifest, seen, force, workers):
+        changed += 1
+        chunks += len(bill["chunk_ids"])
+        previous = manifest.vector_ids(bill["key"])
+        # Each bill's stale vectors are deleted as it is indexed
+        for stale in [
+            stale_ids(previous["summary_ids"], [bill["bill_id"]]),
+            stale_ids(previous["chunk_ids"], bill["chunk_ids"]),
+        ]:
+            deletes += len(stale)
+            delete_requests += math.ceil(len(stale) / DELETE_BATCH_SIZE)
+
+        key, digest, inputs = summary_request(bill)
+        summary = checkpoint.get(key, digest)
+        if summary is None:
+            summary_requests += 1
+            input_tokens += count_tokens(SUMMARY_PROMPT.format(**inputs), SUMMARY_MODEL)
+            output_tokens += EXPECTED_OUTPUT_TOKENS
+
+        embed_texts = [doc.page_content for doc in bill["chunk_docs"]]
+        text_tokens = list(bill["chunk_tokens"])
+        if summary is not None:
+            embed_texts.append(summary)
+            text_tokens.append(count_tokens(summary, EMBEDDING_MODEL))
+        else:
+            # The summary is not written yet; assume a reply of the expected length
+            texts += 1
+            embed_tokens += EXPECTED_OUTPUT_TOKENS
+        keys = [
+            cache_key(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, text)
+            for text in embed_texts
+        ]
+        found = store.get_many(keys) if store is not None else {}
+        for text_key, tokens in zip(keys, text_tokens):
+            texts += 1
+            if text_key in found:
+                cached += 1
+            else:
+                embed_tokens += tokens
+
+        for doc, id in zip(bill["chunk_docs"], bill["chunk_ids"]):
+            vectors += 1
+            upsert_size += payload_bytes(doc.page_content, vector, doc.metadata, id)
+        # About four bytes of summary text per token
+        vectors += 1
+        upsert_size += payload_bytes(
+            summary or "", vector, bill["metadata"], bill["bill_id"]
+        ) + (0 if summary is not None else 4 * EXPECTED_OUTPUT_TOKENS)
+    prepare_seconds = time.monotonic() - started
+
+    removed = 0
+    if limit is None:
+        # Removed bills' vectors are deleted together at the end
+        orphaned = {"summary_ids": 0, "chunk_ids": 0}
+        for key in manifest.missing(seen):
+            removed += 1
+            for field, ids in manifest.vector_ids(key).items():
+                orphaned[field] += len(ids)
+        for count in orphaned.values():
+            deletes += count
+            delete_requests += math.ceil(count / DELETE_BATCH_SIZE)
+
+    embed_requests = request_count(
+        texts - cached, embed_tokens, UPSERT_MAX_VECTORS, EMBED_BATCH_TOKENS
+    )
+    upsert_requests = (
+        request_count(vectors, upsert_size, UPSERT_MAX_VECTORS, UPSERT_MAX_BYTES)
+        + delete_requests
+    )
+
+    duration = {
+        "prepare": prepare_seconds,
+        "summarize": stage_seconds(
+            summary_requests,
+            input_tokens + output_tokens,
+            concurrency,
+            SUMMARY_LATENCY,
+            requests_per_minute,
+            tokens_per_minute,
+        ),
+        "embed": stage_seconds(
+            embed_requests,
+            embed_tokens,
+            2 * UPSERT_CONCURRENCY,
+            EMBED_LATENCY,
+            EMBEDDING_RPM,
+            EMBEDDING_TPM,
+        ),
+        "upsert": stage_seconds(
+            upsert_requests,
+            concurrency=2 * UPSERT_CONCURRENCY,
+            latency=UPSERT_LATENCY,
+            requests_per_minute=UPSERT_RPM,
+        ),
+    }
+    bottleneck = max(duration, key=duration.get)
+    duration["total"] = duration[bottleneck]
+
+    summary_cost = token_cost(input_tokens, SUMMARY_INPUT_PRICE) + token_cost(
+        output_tokens, SUMMARY_OUTPUT_PRICE
+    )
+    embedding_cost = token_cost(embed_tokens, EMBEDDING_PRICE)
+
+    return {
+        "bills": {"read": len(seen), "changed": changed, "removed": removed},
+        "chunks": chunks,
+        "summaries": {
+            "requests": summary_requests,
+            "resumed": changed - summary_requests,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        },
+        "embeddings": {
+            "texts": texts,
+            "cached": cached,
+            "tokens": embed_tokens,
+            "requests": embed_requests,
+        },
+        "upserts": {
+            "vectors": vectors,
+            "bytes": upsert_size,
+            "requests": upsert_requests,
+            "deletes": deletes,
+        },
+        "cost": {
+            "summaries": summary_cost,
+            "embeddings": embedding_cost,
+            "total": summary_cost + embedding_cost,
+        },
+        "duration": duration,
+        "bottleneck": bottleneck,
+    }
+
 
 if __name__ == "__main__":
-    index_documents()
+    parser = argparse.ArgumentParser(description="Index the cleaned bills.")
+    parser.add_argument("--limit", type=int, help="Read at most this many bills")
+    parser.add_argument(
+        "--force", action="store_true", help="Re-index bills that have not changed"
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Estimate tokens, cost and duration without calling any API",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=SUMMARY_CONCURRENCY,
+        help="Summary requests in flight",
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=SUMMARY_RPM, help="Summary requests per minute"
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=SUMMARY_TPM, help="Summary tokens per minute"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=PREPARE_WORKERS,
+        help="Processes loading and splitting bills",
+    )
+    args = parser.parse_args()
+
+    options = (args.limit, args.force, args.concurrency, args.rpm, args.tpm)
+    if args.plan:
+        print_plan(plan_index(*options, args.workers))
+    else:
+        index_documents(*options, args.workers)
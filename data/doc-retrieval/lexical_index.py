@@ -0,0 +1,196 @@
+import re
+import math
+import heapq
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from connection import lazy_singleton
+from document_store import DocumentStore, get_document_store
+
+# Bill references are written "SB 12", "SB-12", "SB12" or "sb_12"; index them
+# all as the single token "sb12" so exact-number searches line up.
+BILL_NUMBER_PATTERN = re.compile(
+    r"(?<![a-z0-9])(sr-a|sb|fb|gb|ab|bb|r)[\s_-]*(\d+)(?!\d)", re.I
+)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+INDEXED_FIELDS = [
+    "id",
+    "long_title",
+    "short_title",
+    "sponsors",
+    "secondary_sponsors",
+]
+# full_text is the clauses joined together, so they are only indexed
+# separately when it is missing
+CLAUSE_FIELDS = ["whereas_clauses", "enacted_clauses", "resolved_clauses"]
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    for prefix, number in BILL_NUMBER_PATTERN.findall(text):
+        tokens.append(prefix.lower().replace("-", "") + number)
+    return tokens
+
+
+def document_text(content: dict) -> str:
+    """Flatten the searchable fields of a cleaned document into one string."""
+    fields = INDEXED_FIELDS + (
+        ["full_text"] if content.get("full_text") else CLAUSE_FIELDS
+    )
+    parts = []
+    for field in fields:
+        value = content.get(field)
+        if isinstance(value, list):
+            parts.extend(str(v) for v in value if v)
+        elif value:
+            parts.append(str(value))
+    return "\n".join(parts)
+
+
+class LexicalIndex:
+    """
+    In-memory inverted index with BM25 scoring.
+
+    Documents can be added, replaced and removed one at a time, so keeping
+    the index in sync with the corpus only re-tokenizes documents whose text
+    actually changed.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._hashes: Dict[str, str] = {}
+        self._terms: Dict[str, List[str]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add_document(self, doc_id: str, text: str) -> bool:
+        """
+        Index `text` under `doc_id`, replacing any previous version.
+
+        Returns:
+            False if the document was already indexed with identical text
+        """
+        text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if self._hashes.get(doc_id) == text_hash:
+            return False
+
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(terms.values())
+            self._lengths[doc_id] = length
+            self._hashes[doc_id] = text_hash
+            self._terms[doc_id] = list(terms)
+            self._total_length += length
+        return True
+
+    def remove_document(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._hashes.pop(doc_id, None)
+        self._total_length -= length
+        for term in self._terms.pop(doc_id):
+            docs = self._postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self._postings[term]
+
+    def sync(self, documents: Dict[str, str]) -> Tuple[int, int]:
+        """
+        Make the index match `documents` (doc ID -> text).
+
+        Returns:
+            (number of documents added or updated, number removed)
+        """
+        updated = sum(
+            1 for doc_id, text in documents.items() if self.add_document(doc_id, text)
+        )
+        removed = [doc_id for doc_id in list(self._lengths) if doc_id not in documents]
+        for doc_id in removed:
+            self.remove_document(doc_id)
+        return updated, len(removed)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to k (doc ID, BM25 score) pairs, best first."""
+        with self._lock:
+            n = len(self._lengths)
+            if n == 0:
+                return []
+            avg_length = self._total_length / n or 1.0
+
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = self.k1 * (
+                        1 - self.b + self.b * self._lengths[doc_id] / avg_length
+                    )
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (
+                        self.k1 + 1
+                    ) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda x: (x[1], x[0]))
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """
+    Merge several ranked ID lists into one.
+
+    Each ID scores sum(1 / (k + rank)) over the lists it appears in; ties keep
+    the order in which IDs were first seen.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+
+
+_shared_index = lazy_singleton(LexicalIndex)
+_synced_generation = -1
+_sync_lock = threading.Lock()
+
+
+def get_lexical_index(document_store: Optional[DocumentStore] = None) -> LexicalIndex:
+    """
+    Get the shared lexical index over the cleaned corpus.
+
+    The index is built on first use and incrementally re-synced whenever the
+    document store has reloaded since the last call.
+    """
+    global _synced_generation
+    document_store = document_store or get_document_store()
+    index = _shared_index()
+    if _synced_generation == document_store.generation:
+        return index
+
+    with _sync_lock:
+        generation = document_store.generation
+        if _synced_generation != generation:
+            documents = {}
+            for _, content in document_store.documents():
+                if content.get("id") is not None:
+                    documents[str(content["id"])] = document_text(content)
+            updated, removed = index.sync(documents)
+            print(f"Lexical index synced: {updated} updated, {removed} removed")
+            _synced_generation = generation
+    return index
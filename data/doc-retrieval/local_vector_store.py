@@ -0,0 +1,540 @@
+import os
+import json
+import uuid
+import threading
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "./local_index")
+# Below this many live vectors a brute-force scan is faster than probing
+IVF_MIN_VECTORS = int(os.getenv("LOCAL_INDEX_IVF_MIN_VECTORS", "20000"))
+IVF_PROBES = int(os.getenv("LOCAL_INDEX_IVF_PROBES", "8"))
+
+VECTORS_FILE = "vectors.f32"
+RECORDS_FILE = "records.jsonl"
+IVF_FILE = "ivf.npz"
+
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    if isinstance(value, list):
+        # Like Pinecone, a list field matches if any of its elements does
+        if operator == "$eq":
+            return operand in value
+        if operator == "$ne":
+            return operand not in value
+        if operator == "$in":
+            return any(v in operand for v in value)
+        if operator == "$nin":
+            return not any(v in operand for v in value)
+        return False
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator '{operator}'")
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Pinecone-style metadata filter, e.g. {"doc_id": {"$eq": "sb_12"}}.
+
+    Supports $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $and and $or, and a
+    bare value as shorthand for $eq. List-valued fields match $eq and $in
+    when any element does.
+    """
+    if not filter:
+        return True
+    for field, condition in filter.items():
+        if field == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif field == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(field)
+            for operator, operand in condition.items():
+                if not _compare(value, operator, operand):
+                    return False
+        elif not _compare(metadata.get(field), "$eq", condition):
+            return False
+    return True
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalVectorStore(VectorStore):
+    """
+    On-disk vector index with cosine similarity search.
+
+    Vectors are appended to a raw float32 file that is memory-mapped for
+    search, and ids, texts and metadata to a JSON-lines log in which the
+    latest record for an id wins. Small indexes are searched by brute force;
+    once an index holds `ivf_min_vectors` vectors it is partitioned with
+    k-means (IVF) and only the `probes` nearest partitions are scanned.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embedding: Embeddings,
+        ivf_min_vectors: int = IVF_MIN_VECTORS,
+        probes: int = IVF_PROBES,
+    ):
+        self.path = path
+        self.embedding = embedding
+        self.ivf_min_vectors = ivf_min_vectors
+        self.probes = probes
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._dimension: Optional[int] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._rows: Dict[str, int] = {}
+        self._records: Dict[int, Tuple[str, str, Dict[str, Any]]] = {}
+        self._field_index: Dict[str, Dict[Any, set]] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # Storage
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        records_path = self._file(RECORDS_FILE)
+        if os.path.exists(records_path):
+            with open(records_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record.get("deleted"):
+                        self._forget(record["id"])
+                    else:
+                        self._remember(
+                            record["row"],
+                            record["id"],
+                            record["text"],
+                            record["metadata"],
+                        )
+                    if "dimension" in record:
+                        self._dimension = record["dimension"]
+        self._map_vectors()
+
+        ivf_path = self._file(IVF_FILE)
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as ivf:
+                self._centroids = ivf["centroids"]
+                self._assignments = ivf["assignments"]
+            self._assign_new_rows()
+
+    def _map_vectors(self):
+        vectors_path = self._file(VECTORS_FILE)
+        if self._dimension is None or not os.path.exists(vectors_path):
+            self._matrix = None
+            return
+        size = os.path.getsize(vectors_path)
+        rows = size // (4 * self._dimension)
+        self._matrix = (
+            np.memmap(vectors_path, dtype=np.float32, mode="r").reshape(
+                rows, self._dimension
+            )
+            if rows
+            else None
+        )
+
+    def _remember(self, row: int, id: str, text: str, metadata: Dict[str, Any]):
+        self._forget(id)
+        if row >= len(self._live):
+            grown = np.zeros(max(row + 1, 2 * len(self._live)), dtype=bool)
+            grown[: len(self._live)] = self._live
+            self._live = grown
+        self._live[row] = True
+        self._rows[id] = row
+        self._records[row] = (id, text, metadata)
+        for field, values in self._field_index.items():
+            for key in _posting_keys(metadata.get(field)):
+                values.setdefault(key, set()).add(row)
+
+    def _forget(self, id: str):
+        row = self._rows.pop(id, None)
+        if row is None:
+            return
+        self._live[row] = False
+        _, _, metadata = self._records.pop(row)
+        for field, values in self._field_index.items():
+            for key in _posting_keys(metadata.get(field)):
+                values.get(key, set()).discard(row)
+
+    def _append_records(self, records: List[Dict[str, Any]]):
+        with open(self._file(RECORDS_FILE), "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    # Writes
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Add precomputed vectors; existing ids are replaced."""
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+
+        with self._lock:
+            if self._dimension is None:
+                self._dimension = vectors.shape[1]
+            elif vectors.shape[1] != self._dimension:
+                raise ValueError(
+                    f"Expected {self._dimension}-dimensional vectors, got {vectors.shape[1]}"
+                )
+
+            start = 0 if self._matrix is None else self._matrix.shape[0]
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                f.write(vectors.tobytes())
+
+            records = []
+            for offset, (id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+                record = {
+                    "row": start + offset,
+                    "id": id,
+                    "text": text,
+                    "metadata": metadata,
+                }
+                if start == 0 and offset == 0:
+                    record["dimension"] = self._dimension
+                records.append(record)
+                self._remember(start + offset, id, text, metadata)
+            self._append_records(records)
+
+            self._map_vectors()
+            if self._centroids is not None:
+                self._assign_new_rows()
+                self._save_ivf()
+            elif len(self._rows) >= self.ivf_min_vectors:
+                self.build_ivf()
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        embeddings = self.embedding.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            ids = [id for id in ids if id in self._rows]
+            for id in ids:
+                self._forget(id)
+            self._append_records([{"id": id, "deleted": True} for id in ids])
+        return True
+
+    def get_by_ids(self, ids, /) -> List[Document]:
+        documents = []
+        for id in ids:
+            row = self._rows.get(id)
+            if row is not None:
+                _, text, metadata = self._records[row]
+                documents.append(
+                    Document(id=id, page_content=text, metadata=dict(metadata))
+                )
+        return documents
+
+    def list_ids(self) -> List[str]:
+        """IDs of every live vector, in storage order."""
+        with self._lock:
+            return [self._records[row][0] for row in sorted(self._records)]
+
+    def get_vectors(
+        self, ids: List[str]
+    ) -> List[Tuple[str, List[float], str, Dict[str, Any]]]:
+        """Get (id, vector, text, metadata) for each of `ids` that exists."""
+        found = []
+        with self._lock:
+            for id in ids:
+                row = self._rows.get(id)
+                if row is not None:
+                    _, text, metadata = self._records[row]
+                    found.append((id, self._matrix[row].tolist(), text, dict(metadata)))
+        return found
+
+    def compact(self):
+        """Rewrite the files without replaced or deleted rows."""
+        with self._lock:
+            if self._matrix is None:
+                return
+            live = sorted(self._records)
+            vectors = np.asarray(self._matrix[live])
+            records = [self._records[row] for row in live]
+
+            vectors_tmp = self._file(VECTORS_FILE + ".tmp")
+            records_tmp = self._file(RECORDS_FILE + ".tmp")
+            with open(vectors_tmp, "wb") as f:
+                f.write(vectors.tobytes())
+            with open(records_tmp, "w", encoding="utf-8") as f:
+                for row, (id, text, metadata) in enumerate(records):
+                    record = {"row": row, "id": id, "text": text, "metadata": metadata}
+                    if row == 0:
+                        record["dimension"] = self._dimension
+                    f.write(json.dumps(record) + "\n")
+
+            self._matrix = None
+            os.replace(vectors_tmp, self._file(VECTORS_FILE))
+            os.replace(records_tmp, self._file(RECORDS_FILE))
+
+            self._rows, self._records = {}, {}
+            self._live = np.zeros(len(records), dtype=bool)
+            self._field_index = {}
+            for row, (id, text, metadata) in enumerate(records):
+                self._remember(row, id, text, metadata)
+            self._map_vectors()
+            if self._centroids is not None:
+                self.build_ivf()
+
+    # IVF partitioning
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10):
+        """Partition the live vectors into `n_lists` clusters with k-means."""
+        with self._lock:
+            rows = 0 if self._matrix is None else self._matrix.shape[0]
+            live = np.flatnonzero(self._live[:rows])
+            if len(live) == 0:
+                # Nothing to partition; searches scan until there is again
+                self._drop_ivf()
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(len(live))))
+            n_lists = min(n_lists, len(live))
+
+            vectors = np.asarray(self._matrix[live])
+            rng = np.random.default_rng(0)
+            centroids = vectors[rng.choice(len(live), n_lists, replace=False)]
+            for _ in range(iterations):
+                labels = np.argmax(vectors @ centroids.T, axis=1)
+                for i in range(n_lists):
+                    members = vectors[labels == i]
+                    if len(members):
+                        centroids[i] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+
+            assignments = np.full(self._matrix.shape[0], -1, dtype=np.int32)
+            assignments[live] = np.argmax(vectors @ centroids.T, axis=1)
+            self._centroids = centroids.astype(np.float32)
+            self._assignments = assignments
+            self._save_ivf()
+
+    def _assign_new_rows(self):
+        total = 0 if self._matrix is None else self._matrix.shape[0]
+        assigned = len(self._assignments)
+        if total <= assigned:
+            return
+        new_vectors = np.asarray(self._matrix[assigned:total])
+        labels = np.argmax(new_vectors @ self._centroids.T, axis=1).astype(np.int32)
+        self._assignments = np.concatenate([self._assignments, labels])
+
+    def _drop_ivf(self):
+        self._centroids = self._assignments = None
+        ivf_path = self._file(IVF_FILE)
+        if os.path.exists(ivf_path):
+            os.remove(ivf_path)
+
+    def _save_ivf(self):
+        tmp_path = self._file(IVF_FILE + ".tmp.npz")
+        np.savez(tmp_path, centroids=self._centroids, assignments=self._assignments)
+        os.replace(tmp_path, self._file(IVF_FILE))
+
+    # Search
+
+    def _candidate_rows(self, filter: Optional[Dict[str, Any]]) -> Optional[set]:
+        """
+        Rows allowed by the filter. The postings of every field matched with
+        $eq or $in, at the top level or inside $and, are intersected, and only
+        the rows left are checked against the rest of the filter.
+        """
+        if not filter:
+            return None
+        clauses = list(filter.items())
+        indexed: List[set] = []
+        rest: List[Dict[str, Any]] = []
+        for field, condition in clauses:
+            if field == "$and":
+                clauses.extend(item for sub in condition for item in sub.items())
+                continue
+            rows = self._posting_rows(field, condition)
+            if rows is None:
+                rest.append({field: condition})
+            else:
+                indexed.append(rows)
+
+        if indexed:
+            indexed.sort(key=len)
+            # Always a new set, so callers never hold on to the postings
+            candidates = indexed[0].intersection(*indexed[1:])
+        else:
+            candidates = self._records.keys()
+        if not rest:
+            return candidates
+        return {
+            row
+            for row in candidates
+            if all(matches_filter(self._records[row][2], clause) for clause in rest)
+        }
+
+    def _posting_rows(self, field: str, condition: Any) -> Optional[set]:
+        """Rows matching one field's condition, or None if postings can't tell."""
+        if field.startswith("$"):
+            return None
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if not condition or any(op not in ("$eq", "$in") for op in condition):
+            return None
+        postings = self._postings(field)
+        rows = None
+        for operator, operand in condition.items():
+            values = operand if operator == "$in" else [operand]
+            # A single value's postings are only read, never modified, here
+            sets = [postings.get(value, set()) for value in values]
+            matched = sets[0] if len(sets) == 1 else set().union(*sets)
+            rows = matched if rows is None else rows & matched
+        return rows
+
+    def _postings(self, field: str) -> Dict[Any, set]:
+        postings = self._field_index.get(field)
+        if postings is None:
+            postings = {}
+            for row, (_, _, metadata) in self._records.items():
+                for key in _posting_keys(metadata.get(field)):
+                    postings.setdefault(key, set()).add(row)
+            self._field_index[field] = postings
+        return postings
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[Document, float]]:
+        with self._lock:
+            matrix = self._matrix
+            if matrix is None or not self._records:
+                return []
+            query = _normalize(np.asarray(embedding, dtype=np.float32))
+
+            candidates = self._candidate_rows(filter)
+            if candidates is None and self._centroids is not None:
+                nearest = np.argsort(-(self._centroids @ query))[: self.probes]
+                in_lists = np.isin(self._assignments, nearest)
+                rows = np.flatnonzero(in_lists & self._live[: len(in_lists)])
+            elif candidates is None:
+                rows = np.flatnonzero(self._live[: matrix.shape[0]])
+            else:
+                rows = np.array(sorted(candidates), dtype=np.int64)
+            if len(rows) == 0:
+                return []
+
+            scores = np.asarray(matrix[rows]) @ query
+            top = np.argsort(-scores, kind="stable")[:k]
+
+            results = []
+            for i in top:
+                id, text, metadata = self._records[int(rows[i])]
+                document = Document(id=id, page_content=text, metadata=dict(metadata))
+                results.append((document, float(scores[i])))
+            return results
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        results = self.similarity_search_with_score_by_vector(embedding, k, filter)
+        return [doc for doc, _ in results]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        embedding = self.embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        results = self.similarity_search_with_score(query, k, filter)
+        return [doc for doc, _ in results]
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        path: str = LOCAL_INDEX_DIR,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(path, embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+
+def _posting_keys(value: Any) -> List[Any]:
+    """Keys a metadata value is indexed under: each element of a list, else itself."""
+    return value if isinstance(value, list) else [value]
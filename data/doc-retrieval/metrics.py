@@ -0,0 +1,207 @@
+import os
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_registry: List["_Metric"] = []
+_NOOP = nullcontext()
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.sample_name} {self.documentation}",
+            f"# TYPE {self.sample_name} {self.type}",
+        ]
+
+    @property
+    def sample_name(self) -> str:
+        return self.name
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    @property
+    def sample_name(self) -> str:
+        return f"{self.name}_total"
+
+    def inc(self, amount: float = 1, *labelvalues: str):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.sample_name}{labels} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, optionally split by labels."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labelvalues -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labelvalues: str):
+        """Context manager that observes the wall time spent inside it."""
+        if not METRICS_ENABLED:
+            return _NOOP
+        return self._timer(labelvalues)
+
+    @contextmanager
+    def _timer(self, labelvalues: Tuple[str, ...]):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for labelvalues, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(
+                        self.labelnames, labelvalues, f'le="{bound}"'
+                    )
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, labelvalues, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "retrieval_stage_seconds",
+    "Time spent in each stage of handling a request.",
+    ["stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "request_seconds",
+    "Total time to produce a response, per endpoint.",
+    ["endpoint"],
+)
+TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "claude_time_to_first_token_seconds",
+    "Time from starting a Claude request to its first streamed token.",
+)
+STREAM_SECONDS = Histogram(
+    "claude_stream_seconds",
+    "Time from starting a Claude request to the end of its stream.",
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Cache look-ups by cache and result (hit, disk_hit, miss, coalesced).",
+    ["cache", "result"],
+)
+RERANK_CALLS = Counter(
+    "rerank_calls",
+    "Calls made to the reranking scorer, by scorer.",
+    ["scorer"],
+)
+RERANK_CANDIDATES = Counter(
+    "rerank_candidates",
+    "Chunks sent to the reranking scorer, by scorer.",
+    ["scorer"],
+)
+LLM_TOKENS = Counter(
+    "llm_tokens",
+    "Tokens used by Claude responses, by direction (input, output).",
+    ["direction"],
+)
+
+
+def span(stage: str):
+    """Time a request stage into retrieval_stage_seconds."""
+    return STAGE_SECONDS.time(stage)
+
+
+def count_cache(cache: str, result: str, amount: int = 1):
+    if amount:
+        CACHE_REQUESTS.inc(amount, cache, result)
@@ -0,0 +1,125 @@
+import os
+import queue
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def background(
+    iterable: Iterable[T], maxsize: int = 4, name: str = "stage"
+) -> Iterator[T]:
+    """
+    Run `iterable` in its own thread, handing items over through a bounded queue.
+
+    Chaining stages with this lets them overlap (the next stage works on item
+    n while this one produces n+1), and the queue bound provides backpressure:
+    a fast producer blocks instead of buffering the whole corpus in memory.
+    Exceptions raised by the producer are re-raised in the consumer.
+    """
+    items: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Failure(e))
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # Unblock the producer if the consumer stops early
+        stop.set()
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Group items into lists of at most `size`."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def map_batches(
+    func: Callable[[List[T]], List[R]], iterable: Iterable[T], size: int
+) -> Iterator[R]:
+    """Apply `func` to consecutive batches of items and flatten the results."""
+    for batch in batched(iterable, size):
+        yield from func(batch)
+
+
+def _apply(func: Callable[[T], R], batch: List[T]) -> List[R]:
+    return [func(item) for item in batch]
+
+
+def process_map(
+    func: Callable[[T], R],
+    iterable: Iterable[T],
+    workers: int = None,
+    batch_size: int = 1,
+) -> Iterator[R]:
+    """
+    Apply `func` to every item in a pool of worker processes, for CPU-bound
+    work that threads cannot spread across cores.
+
+    Items are sent in batches of `batch_size` to amortize pickling, with at
+    most 2 * workers batches in flight, and results are yielded in input
+    order, so output is deterministic and memory stays bounded. `func` must
+    be a module-level function. With one worker, runs inline.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        yield from map(func, iterable)
+        return
+
+    # Pipeline stages run in threads, and forking a threaded process can
+    # deadlock the child, so workers are started fresh
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        in_flight = deque()
+        try:
+            for batch in batched(iterable, batch_size):
+                in_flight.append(executor.submit(_apply, func, batch))
+                if len(in_flight) >= 2 * workers:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
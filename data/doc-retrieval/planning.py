@@ -0,0 +1,101 @@
+import os
+import math
+from typing import Optional
+
+# List prices in USD per million tokens; override when they change
+SUMMARY_INPUT_PRICE = float(os.getenv("SUMMARY_INPUT_PRICE", "0.15"))
+SUMMARY_OUTPUT_PRICE = float(os.getenv("SUMMARY_OUTPUT_PRICE", "0.60"))
+EMBEDDING_PRICE = float(os.getenv("EMBEDDING_PRICE", "0.02"))
+# Typical seconds per request, which bound throughput when limits are generous
+SUMMARY_LATENCY = float(os.getenv("SUMMARY_LATENCY", "6.0"))
+EMBED_LATENCY = float(os.getenv("EMBED_LATENCY", "2.0"))
+UPSERT_LATENCY = float(os.getenv("UPSERT_LATENCY", "0.3"))
+
+
+def token_cost(tokens: int, price_per_million: float) -> float:
+    return tokens * price_per_million / 1_000_000
+
+
+def request_count(items: int, size: int, max_items: int, max_size: int) -> int:
+    """Fewest requests that carry `items` totalling `size` within both limits."""
+    if not items:
+        return 0
+    return max(math.ceil(items / max_items), math.ceil(size / max_size))
+
+
+def stage_seconds(
+    requests: int,
+    tokens: int = 0,
+    concurrency: int = 1,
+    latency: float = 0.0,
+    requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None,
+) -> float:
+    """
+    Time a stage of API calls needs: the slowest of what its concurrency,
+    request rate limit and token rate limit allow.
+    """
+    bounds = [requests * latency / max(concurrency, 1)]
+    if requests_per_minute:
+        bounds.append(requests * 60 / requests_per_minute)
+    if tokens_per_minute:
+        bounds.append(tokens * 60 / tokens_per_minute)
+    return max(bounds)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+def print_plan(plan: dict):
+    """Print a plan made by indexing.plan_index."""
+    bills = plan["bills"]
+    summaries = plan["summaries"]
+    embeddings = plan["embeddings"]
+    upserts = plan["upserts"]
+    cost = plan["cost"]
+    duration = plan["duration"]
+
+    print(
+        f"Bills:       {bills['read']} read, {bills['changed']} new or changed, "
+        f"{bills['removed']} removed"
+    )
+    print(
+        f"Prepare:     {plan['chunks']} chunks from {bills['changed']} bills "
+        f"in {format_duration(duration['prepare'])} (measured)"
+    )
+    print(
+        f"Summarize:   {summaries['requests']} requests "
+        f"({summaries['resumed']} resumed from checkpoint), "
+        f"{summaries['input_tokens']:,} input + {summaries['output_tokens']:,} "
+        f"output tokens, ${cost['summaries']:.4f}"
+    )
+    print(
+        f"Embed:       {embeddings['texts']} texts ({embeddings['cached']} cached), "
+        f"{embeddings['tokens']:,} tokens in {embeddings['requests']} requests, "
+        f"${cost['embeddings']:.4f}"
+    )
+    print(
+        f"Upsert:      {upserts['vectors']} vectors, "
+        f"{upserts['bytes'] / 1_000_000:.1f} MB in {upserts['requests']} requests, "
+        f"{upserts['deletes']} deletes"
+    )
+    print(f"Total cost:  ${cost['total']:.4f}")
+    print(
+        "Duration:    "
+        + ", ".join(
+            f"{stage} {format_duration(duration[stage])}"
+            for stage in ("summarize", "embed", "upsert")
+        )
+    )
+    print(
+        f"Projected:   {format_duration(duration['total'])} with stages overlapping "
+        f"(bottleneck: {plan['bottleneck']})"
+    )
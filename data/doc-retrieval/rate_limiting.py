@@ -0,0 +1,214 @@
+import time
+import random
+import threading
+from functools import lru_cache
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# Rough characters per token of English text, for when tiktoken can't be used
+CHARS_PER_TOKEN = 4
+
+
+class RateLimitError(Exception):
+    """Raised by a client callable when the provider answers 429."""
+
+    def __init__(self, message: str = "rate limited", retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # OpenAI errors carry status_code, Pinecone's carry status
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    return (
+        isinstance(error, RateLimitError)
+        or type(error).__name__ == "RateLimitError"
+        or _status_code(error) == 429
+    )
+
+
+def is_retryable(error: BaseException) -> bool:
+    if is_rate_limit(error):
+        return True
+    if type(error).__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    status = _status_code(error)
+    return status is not None and status >= 500
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, if it said."""
+    if getattr(error, "retry_after", None) is not None:
+        return float(error.retry_after)
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+class TokenBucket:
+    """Allows `rate` units per minute, with bursts up to one minute's worth."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate / 60
+        )
+        self.updated = now
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def acquire(self, amount: float = 1):
+        """Block until `amount` units are available, then take them."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) * 60 / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveRateLimiter:
+    """
+    Request and (optionally) token buckets whose rate adapts to what the
+    provider accepts.
+
+    Each 429 halves the effective rate and pauses everyone for the provider's
+    Retry-After; each success recovers a little of it (AIMD), so the limiter
+    settles just under the real limit even if the configured one is too high.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        min_scale: float = 0.05,
+        recovery: float = 0.02,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.min_scale = min_scale
+        self.recovery = recovery
+        self.scale = 1.0
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        self.requests.acquire(1)
+        if self.tokens is not None:
+            self.tokens.acquire(tokens)
+
+    def _apply_scale(self, scale: float):
+        self.scale = scale
+        self.requests.set_rate(self.requests_per_minute * scale)
+        if self.tokens is not None:
+            self.tokens.set_rate(self.tokens_per_minute * scale)
+
+    def on_success(self):
+        if self.scale < 1.0:
+            with self._lock:
+                self._apply_scale(min(1.0, self.scale + self.recovery))
+
+    def on_rate_limited(self, wait: Optional[float] = None):
+        with self._lock:
+            self._apply_scale(max(self.min_scale, self.scale / 2))
+            if wait:
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+
+
+def call_with_retries(
+    func: Callable[[], T],
+    limiter: Optional[AdaptiveRateLimiter] = None,
+    tokens: int = 0,
+    max_retries: int = 6,
+    on_retry: Optional[Callable[[BaseException], None]] = None,
+) -> T:
+    """
+    Call `func` under `limiter`, retrying 429s and transient errors.
+
+    Waits the longer of the provider's Retry-After and a jittered
+    exponential backoff between attempts. Only use this for idempotent calls.
+    """
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire(tokens)
+        try:
+            result = func()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            wait = retry_after(e)
+            if limiter is not None and is_rate_limit(e):
+                limiter.on_rate_limited(wait)
+            if on_retry is not None:
+                on_retry(e)
+            time.sleep(max(wait or 0.0, backoff_delay(attempt)))
+            continue
+
+        if limiter is not None:
+            limiter.on_success()
+        return result
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """
+    tiktoken's encoding for `model`, or None if it is not cached locally
+    and can't be downloaded (tiktoken fetches encodings on first use).
+    """
+    import tiktoken
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except OSError as e:
+        print(
+            f"No tiktoken encoding for {model} ({type(e).__name__}), "
+            "estimating token counts from text length"
+        )
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """
+    Count tokens the way `model` will bill them, or estimate them from the
+    text's length when the encoding isn't available offline.
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,325 @@
+import os
+import re
+import asyncio
+import math
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Optional, Tuple, Hashable
+from langchain_core.documents import Document
+from connection import lazy_singleton
+from metrics import span, count_cache, RERANK_CALLS, RERANK_CANDIDATES
+
+RERANK_MODEL = "gpt-3.5-turbo"
+RERANK_SCORER = os.getenv("RERANK_SCORER", "listwise")
+RERANK_MAX_CONCURRENCY = int(os.getenv("RERANK_MAX_CONCURRENCY", "8"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "4096"))
+DEFAULT_SCORE = 5.0
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_rating(text: str) -> float:
+    """Pull the integer rating out of a model reply such as 'Rating: 7'."""
+    return float(int("".join(filter(str.isdigit, text))))
+
+
+def _build_chain(model: str, template: str):
+    # Imported here so that loading this module stays cheap at startup
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_openai import ChatOpenAI
+
+    prompt = ChatPromptTemplate.from_template(template)
+    return prompt | ChatOpenAI(model=model, temperature=0) | StrOutputParser()
+
+
+class Scorer:
+    """
+    Scores a batch of candidate chunks against a query.
+
+    Implementations must return one score per document, in input order,
+    where higher means more relevant, or None for a document they could not
+    score (e.g. the request failed), which the reranker neither ranks by
+    nor caches.
+    """
+
+    name = "scorer"
+
+    def score(self, query: str, documents: List[Document]) -> List[Optional[float]]:
+        raise NotImplementedError
+
+    async def ascore(
+        self, query: str, documents: List[Document]
+    ) -> List[Optional[float]]:
+        """Async variant of `score`; runs the sync version in a worker thread."""
+        return await asyncio.to_thread(self.score, query, documents)
+
+
+class LexicalScorer(Scorer):
+    """
+    Deterministic BM25 scorer computed over the candidate set itself.
+
+    Needs no network access, which makes it a cheap default for offline runs
+    and a stable reference when testing the reranking pipeline.
+    """
+
+    name = "lexical"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        if not documents:
+            return []
+
+        doc_terms = [Counter(tokenize(doc.page_content)) for doc in documents]
+        doc_lengths = [sum(terms.values()) for terms in doc_terms]
+        avg_length = (sum(doc_lengths) / len(doc_lengths)) or 1.0
+
+        n = len(documents)
+        query_terms = set(tokenize(query))
+        idf = {}
+        for term in query_terms:
+            df = sum(1 for terms in doc_terms if term in terms)
+            idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+        scores = []
+        for terms, length in zip(doc_terms, doc_lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            total = 0.0
+            for term in query_terms:
+                tf = terms.get(term, 0)
+                if tf:
+                    total += idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(total)
+        return scores
+
+    async def ascore(self, query: str, documents: List[Document]) -> List[float]:
+        return self.score(query, documents)
+
+
+class LLMPointwiseScorer(Scorer):
+    """
+    Rates every chunk with its own prompt, sending up to `max_concurrency`
+    requests at a time instead of one after another.
+    """
+
+    name = "pointwise"
+
+    def __init__(
+        self, model: str = RERANK_MODEL, max_concurrency: int = RERANK_MAX_CONCURRENCY
+    ):
+        self.chain = _build_chain(
+            model,
+            """Given the following query and document chunk, rate how relevant the chunk is
+        to answering the query on a scale from 1-10, where 10 is highly relevant.
+
+        Query: {query}
+
+        Document chunk: {chunk}
+
+        Rating (1-10):""",
+        )
+        self.max_concurrency = max_concurrency
+
+    def _inputs(self, query: str, documents: List[Document]) -> List[dict]:
+        return [{"query": query, "chunk": doc.page_content} for doc in documents]
+
+    def score(self, query: str, documents: List[Document]) -> List[Optional[float]]:
+        replies = self.chain.batch(
+            self._inputs(query, documents),
+            config={"max_concurrency": self.max_concurrency},
+            return_exceptions=True,
+        )
+        return self._parse_replies(replies)
+
+    async def ascore(
+        self, query: str, documents: List[Document]
+    ) -> List[Optional[float]]:
+        replies = await self.chain.abatch(
+            self._inputs(query, documents),
+            config={"max_concurrency": self.max_concurrency},
+            return_exceptions=True,
+        )
+        return self._parse_replies(replies)
+
+    @staticmethod
+    def _parse_replies(replies: list) -> List[Optional[float]]:
+        scores = []
+        for reply in replies:
+            try:
+                if isinstance(reply, Exception):
+                    raise reply
+                scores.append(parse_rating(reply))
+            except Exception as e:
+                print(f"Error during reranking: {e}")
+                scores.append(None)
+        return scores
+
+
+class LLMListwiseScorer(Scorer):
+    """Rates all candidate chunks in a single prompt, i.e. one round trip."""
+
+    name = "listwise"
+
+    def __init__(self, model: str = RERANK_MODEL):
+        self.chain = _build_chain(
+            model,
+            """Given the following query and numbered document chunks, rate how relevant
+        each chunk is to answering the query on a scale from 1-10, where 10 is highly relevant.
+
+        Query: {query}
+
+        {chunks}
+
+        Reply with one line per chunk in the form "<chunk number>: <rating>" and nothing else.""",
+        )
+
+    @staticmethod
+    def _inputs(query: str, documents: List[Document]) -> dict:
+        chunks = "\n\n".join(
+            f"Chunk {i + 1}: {doc.page_content}" for i, doc in enumerate(documents)
+        )
+        return {"query": query, "chunks": chunks}
+
+    def score(self, query: str, documents: List[Document]) -> List[Optional[float]]:
+        try:
+            reply = self.chain.invoke(self._inputs(query, documents))
+        except Exception as e:
+            print(f"Error during reranking: {e}")
+            return [None] * len(documents)
+        return self.parse_ratings(reply, len(documents))
+
+    async def ascore(
+        self, query: str, documents: List[Document]
+    ) -> List[Optional[float]]:
+        try:
+            reply = await self.chain.ainvoke(self._inputs(query, documents))
+        except Exception as e:
+            print(f"Error during reranking: {e}")
+            return [None] * len(documents)
+        return self.parse_ratings(reply, len(documents))
+
+    @staticmethod
+    def parse_ratings(reply: str, count: int) -> List[Optional[float]]:
+        scores: List[Optional[float]] = [None] * count
+        found = 0
+        for number, rating in re.findall(r"(\d+)\s*[:=\-]\s*(\d+)", reply):
+            index = int(number) - 1
+            if 0 <= index < count:
+                scores[index] = float(rating)
+                found += 1
+        if found < count:
+            print(f"Reranker returned {found} of {count} ratings, defaulting the rest")
+        return scores
+
+
+def get_scorer(name: str = RERANK_SCORER) -> Scorer:
+    """Build a scorer by name: 'listwise', 'pointwise' or 'lexical'."""
+    if name == "listwise":
+        return LLMListwiseScorer()
+    if name == "pointwise":
+        return LLMPointwiseScorer()
+    if name == "lexical":
+        return LexicalScorer()
+    raise ValueError(f"Unknown reranking scorer '{name}'")
+
+
+def chunk_key(doc: Document) -> Hashable:
+    """
+    Identify a chunk by a digest of its text. Unlike its position in the
+    bill (chunk_id), this stays valid when the bill is re-chunked.
+    """
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+class Reranker:
+    """
+    Reorders candidate chunks by relevance to a query.
+
+    Scores are cached per (query, chunk text), so only chunks that have not
+    been seen for this query are sent to the scorer, all in one call. A chunk
+    the scorer could not rate is ranked with DEFAULT_SCORE for this request
+    only, and is scored again next time.
+    """
+
+    def __init__(self, scorer: Scorer, cache_size: int = RERANK_CACHE_SIZE):
+        self.scorer = scorer
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, query: str, doc: Document) -> Tuple:
+        return (self.scorer.name, " ".join(query.lower().split()), chunk_key(doc))
+
+    def _lookup(self, query: str, documents: List[Document]):
+        keys = [self._cache_key(query, doc) for doc in documents]
+        scores: List[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                scores.append(score)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        count_cache("rerank", "hit", len(keys) - len(missing))
+        count_cache("rerank", "miss", len(missing))
+        if missing:
+            RERANK_CALLS.inc(1, self.scorer.name)
+            RERANK_CANDIDATES.inc(len(missing), self.scorer.name)
+        return keys, scores, missing
+
+    def _store(self, keys, scores, missing, new_scores):
+        with self._lock:
+            for i, score in zip(missing, new_scores):
+                if score is None:
+                    scores[i] = DEFAULT_SCORE
+                    continue
+                scores[i] = score
+                self._cache[keys[i]] = score
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _top_k(documents: List[Document], scores, k: int) -> List[Document]:
+        # sorted() is stable, so ties keep the vector store's order
+        ranked = sorted(zip(documents, scores), key=lambda x: x[1], reverse=True)
+        return [doc for doc, _ in ranked[:k]]
+
+    def rerank(self, query: str, documents: List[Document], k: int) -> List[Document]:
+        if not documents:
+            return []
+
+        with span("rerank"):
+            keys, scores, missing = self._lookup(query, documents)
+            if missing:
+                new_scores = self.scorer.score(query, [documents[i] for i in missing])
+                self._store(keys, scores, missing, new_scores)
+            return self._top_k(documents, scores, k)
+
+    async def arerank(
+        self, query: str, documents: List[Document], k: int
+    ) -> List[Document]:
+        if not documents:
+            return []
+
+        with span("rerank"):
+            keys, scores, missing = self._lookup(query, documents)
+            if missing:
+                new_scores = await self.scorer.ascore(
+                    query, [documents[i] for i in missing]
+                )
+                self._store(keys, scores, missing, new_scores)
+            return self._top_k(documents, scores, k)
+
+
+@lazy_singleton
+def get_reranker() -> Reranker:
+    """Get the shared reranker configured by RERANK_SCORER."""
+    return Reranker(get_scorer())
@@ -0,0 +1,135 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from index_version import read_index_version
+from metrics import count_cache
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+VERSION_CHECK_INTERVAL = float(os.getenv("INDEX_VERSION_CHECK_INTERVAL", "5"))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class ResultCache:
+    """
+    TTL + LRU cache for endpoint responses, with request coalescing.
+
+    Concurrent misses for the same key share a single computation. The whole
+    cache is dropped whenever the published index version changes.
+    """
+
+    def __init__(
+        self,
+        max_size: int = RESULT_CACHE_SIZE,
+        ttl: float = RESULT_CACHE_TTL,
+        version_check_interval: float = VERSION_CHECK_INTERVAL,
+        version_reader: Callable[[], Optional[str]] = read_index_version,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.version_reader = version_reader
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._version = version_reader()
+        self._version_checked_at = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+        }
+
+    def clear(self):
+        self._entries.clear()
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        version = self.version_reader()
+        if version != self._version:
+            print(f"Index version changed to {version}, clearing result cache")
+            self._version = version
+            self.clear()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached value for `key`, computing it if needed.
+
+        All of this runs on the event loop thread, so no locking is needed.
+        Failures are not cached; they propagate to every coalesced waiter.
+        """
+        self._check_version()
+
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            count_cache("result", "hit")
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            self.misses += 1
+            count_cache("result", "miss")
+            # Run the work in its own task so a caller disconnecting doesn't
+            # cancel it for everyone else waiting on the same key
+            inflight = asyncio.ensure_future(self._compute(key, compute))
+            inflight.add_done_callback(_consume_exception)
+            self._inflight[key] = inflight
+        else:
+            self.coalesced += 1
+            count_cache("result", "coalesced")
+        return await asyncio.shield(inflight)
+
+    async def _compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        version = self._version
+        try:
+            value = await compute()
+            # Don't cache a result computed against an index that was
+            # replaced while we were waiting
+            if version == self._version:
+                self.put(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+
+def _consume_exception(task: asyncio.Future):
+    # Avoid "exception was never retrieved" when every waiter went away
+    if not task.cancelled():
+        task.exception()
@@ -1,16 +1,32 @@
 import os
-import json
-from connection import get_summary_vector_store, get_chunk_vector_store
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import StrOutputParser
-from langchain.retrievers.multi_query import MultiQueryRetriever
-from langchain_core.runnables import RunnablePassthrough
-from langchain.schema import Document
-from typing import List, Optional, Dict, Any, Tuple
-
-
-def retrieve(query: str, k: int = 3, doc_id: Optional[str] = None) -> List[Document]:
+import asyncio
+from connection import (
+    get_embedding,
+    get_summary_vector_store,
+    get_chunk_vector_store,
+)
+from document_store import (
+    get_document_store,
+    split_version,
+    METADATA_FIELDS,
+    VERSIONS,
+)
+from reranking import get_reranker, chunk_key
+from lexical_index import get_lexical_index, reciprocal_rank_fusion
+from metrics import span
+from langchain_core.documents import Document
+from typing import List, Optional, Dict, Any
+
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+LEXICAL_CANDIDATES = 20
+# How many more chunks than the per-document quotas add up to a multi-document
+# query asks for, so that one dominant document doesn't starve the rest
+MULTI_DOC_OVERFETCH = 2
+
+
+def retrieve(
+    query: str, k: int = 3, doc_id: Optional[str] = None, version: Optional[str] = None
+) -> List[Document]:
     """
     Retrieve documents based on the query.
 
@@ -18,51 +34,194 @@ def retrieve(query: str, k: int = 3, doc_id: Optional[str] = None) -> List[Docum
         query: The search query
         k: Number of documents to retrieve
         doc_id: Optional document ID to restrict search to a specific document's chunks
+        version: Optional bill version (e.g. "first_reading") to restrict search to
 
     Returns:
         List of retrieved documents
     """
     if doc_id:
-        return retrieve_chunks(query, doc_id, k)
+        return retrieve_chunks(query, doc_id, k, version)
     else:
-        return retrieve_summaries(query, k)
+        return retrieve_summaries(query, k, version)
+
 
+def summary_filter(version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Restrict summaries to bills that have `version`."""
+    return {"versions": {"$in": [version]}} if version else None
+
+
+def chunk_filter(doc_ids: List[str], version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Restrict chunks to the given documents.
 
-def retrieve_summaries(query: str, k: int = 3) -> List[Document]:
+    Each chunk lists the document IDs (one per version) whose text contains
+    it. With a version, chunks are instead matched by bill, so any version's
+    ID can be used to ask for another version of the same bill.
+    """
+    if not version:
+        return {"doc_ids": {"$in": doc_ids}}
+    bills = list(dict.fromkeys(split_version(doc_id)[0] for doc_id in doc_ids))
+    return {"bill": {"$in": bills}, "versions": {"$in": [version]}}
+
+
+def chunk_documents(
+    chunk: Document, doc_ids: List[str], version: Optional[str] = None
+) -> List[str]:
+    """Which of the requested documents a retrieved chunk belongs to."""
+    if not version:
+        owners = chunk.metadata.get("doc_ids") or [chunk.metadata.get("doc_id")]
+        return [doc_id for doc_id in doc_ids if doc_id in owners]
+    bill = chunk.metadata.get("bill")
+    return [doc_id for doc_id in doc_ids if split_version(doc_id)[0] == bill]
+
+
+def retrieve_summaries(
+    query: str, k: int = 3, version: Optional[str] = None
+) -> List[Document]:
     """
     Retrieve document summaries based on the query.
 
     Args:
         query: The search query
         k: Number of documents to retrieve
+        version: Optional bill version to restrict search to
 
     Returns:
         List of retrieved documents
     """
     summary_vector_store = get_summary_vector_store()
 
-    results = summary_vector_store.similarity_search(query, k=k)
+    vector_k = k * 2 if HYBRID_RETRIEVAL else k
+    with span("embed"):
+        embedding = get_embedding().embed_query(query)
+    with span("vector_query"):
+        results = summary_vector_store.similarity_search_by_vector(
+            embedding, k=vector_k, filter=summary_filter(version)
+        )
+
+    if HYBRID_RETRIEVAL:
+        results = fuse_with_lexical(query, results, k, version)
+
+    return add_excerpts(results)
 
-    enhanced_results = []
-    for doc in results:
-        doc_id = doc.metadata["id"]
 
-        file_path = f"cleaned_json/{doc_id}.json"
-        if os.path.exists(file_path):
-            with open(file_path, "r") as f:
-                doc_json = json.load(f)
-                full_text = doc_json.get("full_text", "")
+async def aretrieve_summaries(
+    query: str, k: int = 3, version: Optional[str] = None
+) -> List[Document]:
+    """Async variant of `retrieve_summaries`."""
+    summary_vector_store = get_summary_vector_store()
+
+    vector_k = k * 2 if HYBRID_RETRIEVAL else k
+    with span("embed"):
+        embedding = await get_embedding().aembed_query(query)
+    with span("vector_query"):
+        results = await summary_vector_store.asimilarity_search_by_vector(
+            embedding, k=vector_k, filter=summary_filter(version)
+        )
+
+    if HYBRID_RETRIEVAL:
+        results = fuse_with_lexical(query, results, k, version)
 
-                doc.metadata["excerpt"] = (
-                    full_text[:500] + "..." if len(full_text) > 500 else full_text
-                )
+    return add_excerpts(results)
+
+
+def fuse_with_lexical(
+    query: str,
+    vector_results: List[Document],
+    k: int,
+    version: Optional[str] = None,
+) -> List[Document]:
+    """
+    Merge vector search results with BM25 results over the cleaned corpus
+    using reciprocal-rank fusion.
 
-        enhanced_results.append(doc)
+    The lexical index holds every version of a bill separately, so lexical
+    hits are collapsed to one per bill, ranked by the bill's best hit: the
+    summary the vector search returned for it if there is one, else the
+    latest of its versions that matched. A bill found only lexically has no
+    summary to return, so its document is empty and marked `lexical_only`;
+    its text reaches callers as the excerpt `add_excerpts` attaches.
+
+    Args:
+        query: The search query
+        vector_results: Summary documents from the vector store, best first
+        k: Number of documents to return
+        version: Optional bill version to restrict lexical hits to
+
+    Returns:
+        The top k fused documents
+    """
+    with span("lexical_search"):
+        lexical_results = get_lexical_index().search(query, LEXICAL_CANDIDATES)
+    if version:
+        lexical_results = [
+            (doc_id, score)
+            for doc_id, score in lexical_results
+            if split_version(doc_id)[1] == version
+        ]
+    if not lexical_results:
+        return vector_results[:k]
+
+    by_id = {doc.metadata["id"]: doc for doc in vector_results}
+    by_bill = {split_version(doc_id)[0]: doc_id for doc_id in by_id}
+    # Bill -> its matching version IDs, in order of the bill's best hit
+    lexical_bills: Dict[str, List[str]] = {}
+    for doc_id, _ in lexical_results:
+        lexical_bills.setdefault(split_version(doc_id)[0], []).append(doc_id)
+    lexical_ids = [
+        by_bill.get(bill) or max(doc_ids, key=version_preference)
+        for bill, doc_ids in lexical_bills.items()
+    ]
+    fused_ids = reciprocal_rank_fusion([list(by_id), lexical_ids])
+
+    document_store = get_document_store()
+    results = []
+    for doc_id in fused_ids[:k]:
+        doc = by_id.get(doc_id)
+        if doc is None:
+            # Only found lexically, with metadata shaped like the index's
+            content = document_store.get(doc_id) or {}
+            metadata = {
+                field: str(content[field])
+                for field in METADATA_FIELDS
+                if content.get(field) is not None
+            }
+            metadata["id"] = doc_id
+            metadata["lexical_only"] = True
+            doc = Document(page_content="", metadata=metadata)
+        results.append(doc)
+    return results
+
+
+def version_preference(doc_id: str) -> int:
+    """Rank a bill's versions like indexing does: final outcomes, then later readings."""
+    version = split_version(doc_id)[1]
+    if version is None or version == "unknown":
+        return -1
+    return VERSIONS.index(version)
+
+
+def add_excerpts(results: List[Document]) -> List[Document]:
+    """Attach the full-text excerpt of each summary's document to its metadata."""
+    document_store = get_document_store()
+
+    enhanced_results = []
+    with span("document_store"):
+        for doc in results:
+            doc_id = doc.metadata["id"]
+
+            excerpt = document_store.get_excerpt(doc_id)
+            if excerpt is not None:
+                doc.metadata["excerpt"] = excerpt
+
+            enhanced_results.append(doc)
 
     return enhanced_results
 
 
-def retrieve_chunks(query: str, doc_id: str, k: int = 5) -> List[Document]:
+def retrieve_chunks(
+    query: str, doc_id: str, k: int = 5, version: Optional[str] = None
+) -> List[Document]:
     """
     Retrieve chunks from a specific document based on the query.
 
@@ -70,20 +229,160 @@ def retrieve_chunks(query: str, doc_id: str, k: int = 5) -> List[Document]:
         query: The search query
         doc_id: Document ID to restrict search to
         k: Number of chunks to retrieve
+        version: Optional version of the document's bill to search instead
 
     Returns:
         List of retrieved document chunks
     """
     chunk_vector_store = get_chunk_vector_store()
 
-    filter_dict = {"doc_id": {"$eq": doc_id}}
+    filter_dict = chunk_filter([doc_id], version)
+
+    with span("embed"):
+        embedding = get_embedding().embed_query(query)
+    with span("vector_query"):
+        results = chunk_vector_store.similarity_search_by_vector(
+            embedding, k=k, filter=filter_dict
+        )
+
+    return results
+
+
+async def aretrieve_chunks(
+    query: str, doc_id: str, k: int = 5, version: Optional[str] = None
+) -> List[Document]:
+    """Async variant of `retrieve_chunks`."""
+    chunk_vector_store = get_chunk_vector_store()
+
+    filter_dict = chunk_filter([doc_id], version)
 
-    results = chunk_vector_store.similarity_search(query, k=k, filter=filter_dict)
+    with span("embed"):
+        embedding = await get_embedding().aembed_query(query)
+    with span("vector_query"):
+        results = await chunk_vector_store.asimilarity_search_by_vector(
+            embedding, k=k, filter=filter_dict
+        )
 
     return results
 
 
-def retrieve_with_reranking(query: str, doc_id: str, k: int = 5) -> List[Document]:
+def retrieve_chunks_multi(
+    query: str, doc_ids: List[str], k_per_doc: int = 5, version: Optional[str] = None
+) -> Dict[str, List[Document]]:
+    """
+    Retrieve chunks from several documents with a single vector query.
+
+    The query is embedded once and searched with a `$in` filter over all of
+    the documents, over-fetching so each document can fill its quota.
+    Documents still short of their quota are topped up with one more query
+    restricted to them.
+
+    Args:
+        query: The search query
+        doc_ids: Document IDs to restrict search to
+        k_per_doc: Maximum number of chunks to return per document
+        version: Optional bill version to search instead of the documents' own
+
+    Returns:
+        Dictionary of document ID to its retrieved chunks, in doc_ids order
+    """
+    doc_ids = list(dict.fromkeys(doc_ids))
+    if not doc_ids:
+        return {}
+
+    chunk_vector_store = get_chunk_vector_store()
+    with span("embed"):
+        embedding = get_embedding().embed_query(query)
+
+    k = k_per_doc * len(doc_ids) * MULTI_DOC_OVERFETCH
+    with span("vector_query"):
+        results = chunk_vector_store.similarity_search_by_vector(
+            embedding, k=k, filter=chunk_filter(doc_ids, version)
+        )
+    per_doc = split_by_document(results, doc_ids, k_per_doc, version)
+
+    short = [doc_id for doc_id, chunks in per_doc.items() if len(chunks) < k_per_doc]
+    # Fewer results than requested means every matching chunk was returned
+    if short and len(results) >= k:
+        with span("vector_query"):
+            more = chunk_vector_store.similarity_search_by_vector(
+                embedding,
+                k=k_per_doc * len(short),
+                filter=chunk_filter(short, version),
+            )
+        merge_by_document(per_doc, more, k_per_doc, version)
+
+    return per_doc
+
+
+async def aretrieve_chunks_multi(
+    query: str, doc_ids: List[str], k_per_doc: int = 5, version: Optional[str] = None
+) -> Dict[str, List[Document]]:
+    """Async variant of `retrieve_chunks_multi`."""
+    doc_ids = list(dict.fromkeys(doc_ids))
+    if not doc_ids:
+        return {}
+
+    chunk_vector_store = get_chunk_vector_store()
+    with span("embed"):
+        embedding = await get_embedding().aembed_query(query)
+
+    k = k_per_doc * len(doc_ids) * MULTI_DOC_OVERFETCH
+    with span("vector_query"):
+        results = await chunk_vector_store.asimilarity_search_by_vector(
+            embedding, k=k, filter=chunk_filter(doc_ids, version)
+        )
+    per_doc = split_by_document(results, doc_ids, k_per_doc, version)
+
+    short = [doc_id for doc_id, chunks in per_doc.items() if len(chunks) < k_per_doc]
+    # Fewer results than requested means every matching chunk was returned
+    if short and len(results) >= k:
+        with span("vector_query"):
+            more = await chunk_vector_store.asimilarity_search_by_vector(
+                embedding,
+                k=k_per_doc * len(short),
+                filter=chunk_filter(short, version),
+            )
+        merge_by_document(per_doc, more, k_per_doc, version)
+
+    return per_doc
+
+
+def split_by_document(
+    results: List[Document],
+    doc_ids: List[str],
+    k_per_doc: int,
+    version: Optional[str] = None,
+) -> Dict[str, List[Document]]:
+    """Group ranked chunks by document, keeping at most k_per_doc of each."""
+    per_doc = {doc_id: [] for doc_id in doc_ids}
+    merge_by_document(per_doc, results, k_per_doc, version)
+    return per_doc
+
+
+def merge_by_document(
+    per_doc: Dict[str, List[Document]],
+    results: List[Document],
+    k_per_doc: int,
+    version: Optional[str] = None,
+):
+    # A chunk shared by several versions can belong to more than one document
+    seen = {
+        (doc_id, chunk_key(doc)) for doc_id, chunks in per_doc.items() for doc in chunks
+    }
+    doc_ids = list(per_doc)
+    for doc in results:
+        key = chunk_key(doc)
+        for doc_id in chunk_documents(doc, doc_ids, version):
+            chunks = per_doc[doc_id]
+            if len(chunks) < k_per_doc and (doc_id, key) not in seen:
+                seen.add((doc_id, key))
+                chunks.append(doc)
+
+
+def retrieve_with_reranking(
+    query: str, doc_id: str, k: int = 5, version: Optional[str] = None
+) -> List[Document]:
     """
     Retrieve chunks with query-aware reranking.
 
@@ -91,48 +390,73 @@ def retrieve_with_reranking(query: str, doc_id: str, k: int = 5) -> List[Documen
         query: The search query
         doc_id: Document ID to restrict search to
         k: Number of chunks to retrieve
+        version: Optional version of the document's bill to search instead
 
     Returns:
         List of retrieved and reranked document chunks
     """
 
     initial_k = min(k * 3, 20)
-    initial_results = retrieve_chunks(query, doc_id, initial_k)
+    initial_results = retrieve_chunks(query, doc_id, initial_k, version)
 
     if not initial_results:
         return []
 
-    rerank_prompt = ChatPromptTemplate.from_template(
-        """Given the following query and document chunk, rate how relevant the chunk is 
-        to answering the query on a scale from 1-10, where 10 is highly relevant.
-        
-        Query: {query}
-        
-        Document chunk: {chunk}
-        
-        Rating (1-10):"""
-    )
+    return get_reranker().rerank(query, initial_results, k)
 
-    model = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-    rerank_chain = rerank_prompt | model | StrOutputParser()
 
-    ratings = []
-    for doc in initial_results:
-        try:
-            rating_str = rerank_chain.invoke(
-                {"query": query, "chunk": doc.page_content}
-            )
-            rating = int("".join(filter(str.isdigit, rating_str)))
-            ratings.append((doc, rating))
-        except Exception as e:
-            print(f"Error during reranking: {e}")
-            ratings.append((doc, 5))
-
-    sorted_results = [
-        doc for doc, _ in sorted(ratings, key=lambda x: x[1], reverse=True)[:k]
-    ]
+async def aretrieve_with_reranking(
+    query: str, doc_id: str, k: int = 5, version: Optional[str] = None
+) -> List[Document]:
+    """Async variant of `retrieve_with_reranking`."""
 
-    return sorted_results
+    initial_k = min(k * 3, 20)
+    initial_results = await aretrieve_chunks(query, doc_id, initial_k, version)
+
+    if not initial_results:
+        return []
+
+    return await get_reranker().arerank(query, initial_results, k)
+
+
+def retrieve_with_reranking_multi(
+    query: str, doc_ids: List[str], k: int = 5, version: Optional[str] = None
+) -> Dict[str, List[Document]]:
+    """
+    Retrieve chunks from several documents in one vector query, then rerank
+    each document's candidates.
+
+    Args:
+        query: The search query
+        doc_ids: Document IDs to restrict search to
+        k: Number of chunks to retrieve per document
+        version: Optional bill version to search instead of the documents' own
+
+    Returns:
+        Dictionary of document ID to its reranked chunks, in doc_ids order
+    """
+    initial_k = min(k * 3, 20)
+    candidates = retrieve_chunks_multi(query, doc_ids, initial_k, version)
+
+    reranker = get_reranker()
+    return {
+        doc_id: reranker.rerank(query, chunks, k) if chunks else []
+        for doc_id, chunks in candidates.items()
+    }
+
+
+async def aretrieve_with_reranking_multi(
+    query: str, doc_ids: List[str], k: int = 5, version: Optional[str] = None
+) -> Dict[str, List[Document]]:
+    """Async variant of `retrieve_with_reranking_multi`; documents are reranked concurrently."""
+    initial_k = min(k * 3, 20)
+    candidates = await aretrieve_chunks_multi(query, doc_ids, initial_k, version)
+
+    reranker = get_reranker()
+    reranked = await asyncio.gather(
+        *(reranker.arerank(query, chunks, k) for chunks in candidates.values())
+    )
+    return dict(zip(candidates, reranked))
 
 
 def get_document_metadata(doc_id: str) -> Dict[str, Any]:
@@ -145,20 +469,5 @@ def get_document_metadata(doc_id: str) -> Dict[str, Any]:
     Returns:
         Document metadata as a dictionary
     """
-    file_path = f"cleaned_json/{doc_id}.json"
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            doc_json = json.load(f)
-            return {
-                "id": doc_json.get("id"),
-                "version": doc_json.get("version"),
-                "long_title": doc_json.get("long_title"),
-                "short_title": doc_json.get("short_title"),
-                "sponsors": doc_json.get("sponsors"),
-                "secondary_sponsors": doc_json.get("secondary_sponsors"),
-                "first_reading": doc_json.get("first_reading"),
-                "second_reading": doc_json.get("second_reading"),
-                "result": doc_json.get("result"),
-                "session": doc_json.get("session"),
-            }
-    return {}
+    with span("document_store"):
+        return get_document_store().get_metadata(doc_id)
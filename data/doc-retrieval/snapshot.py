@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.vectorstores import VectorStore
+from connection import (
+    SUMMARY_INDEX_NAME,
+    CHUNK_INDEX_NAME,
+    get_summary_vector_store,
+    get_chunk_vector_store,
+)
+from index_manifest import INDEX_MANIFEST_FILE
+from index_version import publish_index_version
+from rate_limiting import AdaptiveRateLimiter, call_with_retries
+from upserts import UPSERT_CONCURRENCY, UPSERT_RPM, payload_batches, write_vectors
+
+SNAPSHOT_FORMAT = 1
+VECTORS_FILE = "vectors.npy"
+COLUMNS_FILE = "columns.json"
+MANIFEST_FILE = "manifest.json"
+FETCH_BATCH_SIZE = 100
+RESTORE_BATCH_SIZE = 1000
+
+INDEXES = {
+    SUMMARY_INDEX_NAME: get_summary_vector_store,
+    CHUNK_INDEX_NAME: get_chunk_vector_store,
+}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_ids(vector_store: VectorStore) -> List[str]:
+    """IDs of every vector in the store."""
+    if hasattr(vector_store, "list_ids"):
+        return vector_store.list_ids()
+
+    index = getattr(vector_store, "index", None)
+    if index is None:
+        raise ValueError(f"Cannot list the vectors of {type(vector_store).__name__}")
+    ids = []
+    for page in index.list(namespace=getattr(vector_store, "_namespace", None)):
+        ids.extend(page)
+    return ids
+
+
+def fetch_vectors(
+    vector_store: VectorStore, ids: List[str]
+) -> List[Tuple[str, List[float], str, Dict[str, Any]]]:
+    """Get (id, vector, text, metadata) for each of `ids` that exists."""
+    if hasattr(vector_store, "get_vectors"):
+        return vector_store.get_vectors(ids)
+
+    # PineconeVectorStore keeps the page content in the metadata
+    text_key = vector_store._text_key
+    response = vector_store.index.fetch(
+        ids=ids, namespace=getattr(vector_store, "_namespace", None)
+    )
+    found = []
+    for id in ids:
+        vector = response.vectors.get(id)
+        if vector is None:
+            continue
+        metadata = dict(vector.metadata or {})
+        text = metadata.pop(text_key, "")
+        found.append((id, list(vector.values), text, metadata))
+    return found
+
+
+def export_snapshot(vector_store: VectorStore, path: str, dtype: str = "float32"):
+    """
+    Write every vector in `vector_store` to a snapshot directory.
+
+    The snapshot holds vectors.npy (an N x D matrix in `dtype`), columns.json
+    (ids, texts and one list per metadata field, aligned with the matrix rows)
+    and manifest.json with the sha256 of each file. The manifest is written
+    last, so an interrupted export is never mistaken for a complete one.
+
+    Returns:
+        The snapshot manifest
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    ids = list_ids(vector_store)
+    tmp_vectors_path = os.path.join(path, VECTORS_FILE + ".tmp")
+    matrix = None
+    exported_ids: List[str] = []
+    texts: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+
+    for start in range(0, len(ids), FETCH_BATCH_SIZE):
+        batch_ids = ids[start : start + FETCH_BATCH_SIZE]
+        batch = call_with_retries(lambda: fetch_vectors(vector_store, batch_ids))
+        for id, vector, text, metadata in batch:
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(
+                    tmp_vectors_path,
+                    mode="w+",
+                    dtype=dtype,
+                    shape=(len(ids), len(vector)),
+                )
+            matrix[len(exported_ids)] = vector
+            exported_ids.append(id)
+            texts.append(text)
+            metadatas.append(metadata)
+        print(f"Exported {len(exported_ids)}/{len(ids)} vectors")
+
+    # Vectors deleted while exporting leave unused rows at the end
+    vectors_path = os.path.join(path, VECTORS_FILE)
+    if matrix is None:
+        np.save(vectors_path, np.zeros((0, 0), dtype=dtype))
+    else:
+        np.save(vectors_path, matrix[: len(exported_ids)])
+        del matrix
+        os.remove(tmp_vectors_path)
+
+    fields = sorted({field for metadata in metadatas for field in metadata})
+    columns = {
+        "id": exported_ids,
+        "text": texts,
+        "metadata": {
+            field: [metadata.get(field) for metadata in metadatas] for field in fields
+        },
+    }
+    columns_path = os.path.join(path, COLUMNS_FILE)
+    with open(columns_path, "w", encoding="utf-8") as f:
+        json.dump(columns, f)
+
+    dimensions = int(np.load(vectors_path, mmap_mode="r").shape[1])
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": time.time(),
+        "count": len(exported_ids),
+        "dimensions": dimensions,
+        "dtype": dtype,
+        "files": {
+            VECTORS_FILE: file_sha256(vectors_path),
+            COLUMNS_FILE: file_sha256(columns_path),
+        },
+    }
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def verify_snapshot(path: str) -> dict:
+    """Check a snapshot's files against its manifest and return the manifest."""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"'{path}' is not a complete snapshot (no {MANIFEST_FILE})")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')}")
+    for name, expected in manifest["files"].items():
+        if file_sha256(os.path.join(path, name)) != expected:
+            raise ValueError(f"Snapshot file '{name}' does not match its checksum")
+    return manifest
+
+
+def restore_snapshot(
+    path: str,
+    vector_store: VectorStore,
+    concurrency: int = UPSERT_CONCURRENCY,
+    batch_size: int = RESTORE_BATCH_SIZE,
+) -> int:
+    """
+    Bulk-load a snapshot into `vector_store`, replacing what it holds.
+
+    Rows are written in batches of `batch_size` on `concurrency` threads,
+    in upserts sized by payload and retried under an adaptive rate limiter.
+    Vectors in the store that are not in the snapshot are deleted.
+
+    Returns:
+        The number of vectors written
+    """
+    manifest = verify_snapshot(path)
+    matrix = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    with open(os.path.join(path, COLUMNS_FILE), "r", encoding="utf-8") as f:
+        columns = json.load(f)
+    ids, texts, metadata_columns = columns["id"], columns["text"], columns["metadata"]
+    limiter = AdaptiveRateLimiter(UPSERT_RPM)
+
+    snapshot_ids = set(ids)
+    extra = [id for id in list_ids(vector_store) if id not in snapshot_ids]
+    for start in range(0, len(extra), batch_size):
+        batch = extra[start : start + batch_size]
+        call_with_retries(lambda: vector_store.delete(ids=batch), limiter)
+    if extra:
+        print(f"Deleted {len(extra)} vectors not in the snapshot")
+
+    def write(start: int, end: int) -> int:
+        items = [
+            (
+                texts[i],
+                matrix[i].astype(np.float32).tolist(),
+                {
+                    field: values[i]
+                    for field, values in metadata_columns.items()
+                    if values[i] is not None
+                },
+                ids[i],
+            )
+            for i in range(start, end)
+        ]
+        for batch in payload_batches(items):
+            batch_texts, batch_vectors, batch_metadatas, batch_ids = map(
+                list, zip(*batch)
+            )
+            call_with_retries(
+                lambda: write_vectors(
+                    vector_store, batch_texts, batch_vectors, batch_metadatas, batch_ids
+                ),
+                limiter,
+            )
+        return end - start
+
+    count = manifest["count"]
+    written = 0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(write, start, min(start + batch_size, count))
+            for start in range(0, count, batch_size)
+        ]
+        for future in as_completed(futures):
+            written += future.result()
+            elapsed = max(time.monotonic() - started, 1e-9)
+            print(f"Restored {written}/{count} vectors ({written / elapsed:.1f}/s)")
+    return written
+
+
+def snapshot_indexes(path: str, dtype: str = "float32"):
+    """Export both indexes, plus the index manifest, to `path`."""
+    for name, get_vector_store in INDEXES.items():
+        manifest = export_snapshot(get_vector_store(), os.path.join(path, name), dtype)
+        print(f"Snapshot of {name}: {manifest['count']} vectors")
+    if os.path.exists(INDEX_MANIFEST_FILE):
+        shutil.copyfile(
+            INDEX_MANIFEST_FILE,
+            os.path.join(path, os.path.basename(INDEX_MANIFEST_FILE)),
+        )
+
+
+def restore_indexes(path: str, concurrency: int = UPSERT_CONCURRENCY):
+    """Restore both indexes from `path` into the configured backend."""
+    # Check everything before writing anything
+    for name in INDEXES:
+        verify_snapshot(os.path.join(path, name))
+
+    for name, get_vector_store in INDEXES.items():
+        written = restore_snapshot(
+            os.path.join(path, name), get_vector_store(), concurrency
+        )
+        print(f"Restored {name}: {written} vectors")
+
+    # Incremental indexing picks up from the snapshot's state
+    manifest_copy = os.path.join(path, os.path.basename(INDEX_MANIFEST_FILE))
+    if os.path.exists(manifest_copy):
+        shutil.copyfile(manifest_copy, INDEX_MANIFEST_FILE)
+
+    version = publish_index_version()
+    print(f"Published index version {version}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or restore index snapshots.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Snapshot both indexes")
+    export_parser.add_argument("path")
+    export_parser.add_argument(
+        "--float16", action="store_true", help="Store vectors at half precision"
+    )
+
+    restore_parser = subparsers.add_parser(
+        "restore", help="Load a snapshot into the configured VECTOR_BACKEND"
+    )
+    restore_parser.add_argument("path")
+    restore_parser.add_argument("--concurrency", type=int, default=UPSERT_CONCURRENCY)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        snapshot_indexes(args.path, "float16" if args.float16 else "float32")
+    else:
+        restore_indexes(args.path, args.concurrency)
@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+from connection import lazy_singleton
+from rate_limiting import (
+    AdaptiveRateLimiter,
+    RateLimitError,
+    call_with_retries,
+    count_tokens,
+)
+
+T = TypeVar("T")
+
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+# Limits of the OpenAI account tier; the limiter starts here and backs off on 429s
+SUMMARY_RPM = int(os.getenv("SUMMARY_RPM", "500"))
+SUMMARY_TPM = int(os.getenv("SUMMARY_TPM", "200000"))
+SUMMARY_MAX_RETRIES = 6
+SUMMARY_CHECKPOINT_FILE = os.getenv(
+    "SUMMARY_CHECKPOINT_FILE", "./summary_checkpoint.jsonl"
+)
+# Reserved per request on top of the prompt, since the reply length is unknown upfront
+EXPECTED_OUTPUT_TOKENS = 400
+
+
+class SummaryCheckpoint:
+    """
+    Append-only log of finished summaries, so a crashed run resumes instead
+    of paying for them again. Entries are keyed by bill and content hash.
+    """
+
+    def __init__(self, path: str = SUMMARY_CHECKPOINT_FILE):
+        self.path = path
+        self._summaries: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The last line may be cut short by a crash
+                        continue
+                    self._summaries[entry["key"]] = (entry["hash"], entry["summary"])
+        except FileNotFoundError:
+            pass
+        self._file = None
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def get(self, key: str, digest: str) -> Optional[str]:
+        entry = self._summaries.get(key)
+        if entry and entry[0] == digest:
+            return entry[1]
+        return None
+
+    def put(self, key: str, digest: str, summary: str):
+        line = json.dumps({"key": key, "hash": digest, "summary": summary})
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._summaries[key] = (digest, summary)
+
+    def clear(self):
+        """Drop the checkpoint once its summaries have been safely indexed."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._summaries = {}
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def make_openai_llm(model: str) -> Callable[[str], str]:
+    """
+    Wrap an OpenAI chat model as a prompt -> text callable.
+
+    The client is built on the first call, so a run with nothing to
+    summarize never needs it.
+    """
+
+    @lazy_singleton
+    def get_chain():
+        from langchain_openai import ChatOpenAI
+        from langchain_core.output_parsers import StrOutputParser
+
+        # Retries are handled by the Summarizer so they go through its limiter
+        return ChatOpenAI(model=model, max_retries=0) | StrOutputParser()
+
+    return lambda prompt: get_chain().invoke(prompt)
+
+
+class FakeLLM:
+    """
+    Stand-in for the chat model when exercising the summarizer offline.
+
+    Every call sleeps for `latency` seconds and fails with a 429 with
+    probability `rate_limit_probability`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        rate_limit_probability: float = 0.0,
+        retry_after: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.calls = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            limited = self._random.random() < self.rate_limit_probability
+            if limited:
+                self.rate_limited += 1
+        time.sleep(self.latency)
+        if limited:
+            raise RateLimitError(retry_after=self.retry_after)
+        return f"Summary of {len(prompt)} characters."
+
+
+class Summarizer:
+    """
+    Runs summaries concurrently under an adaptive rate limiter.
+
+    Prompts are rendered per item from a template, rate-limited on both
+    requests and estimated tokens, retried with jittered backoff on 429s and
+    transient errors, and checkpointed as they finish. Results come back in
+    input order, with at most 2 * concurrency items in flight.
+    """
+
+    def __init__(
+        self,
+        llm: Callable[[str], str],
+        prompt: str,
+        concurrency: int = SUMMARY_CONCURRENCY,
+        limiter: Optional[AdaptiveRateLimiter] = None,
+        checkpoint: Optional[SummaryCheckpoint] = None,
+        max_retries: int = SUMMARY_MAX_RETRIES,
+        token_counter: Callable[[str], int] = count_tokens,
+    ):
+        self.llm = llm
+        self.prompt = prompt
+        self.concurrency = concurrency
+        self.limiter = limiter or AdaptiveRateLimiter(SUMMARY_RPM, SUMMARY_TPM)
+        self.checkpoint = checkpoint
+        self.max_retries = max_retries
+        self.token_counter = token_counter
+
+        self.completed = 0
+        self.resumed = 0
+        self.retries = 0
+
+    def summarize(self, key: str, digest: str, inputs: dict) -> str:
+        if self.checkpoint is not None:
+            summary = self.checkpoint.get(key, digest)
+            if summary is not None:
+                self.resumed += 1
+                return summary
+
+        prompt = self.prompt.format(**inputs)
+        summary = call_with_retries(
+            lambda: self.llm(prompt),
+            self.limiter,
+            self.token_counter(prompt) + EXPECTED_OUTPUT_TOKENS,
+            self.max_retries,
+            on_retry=self._count_retry,
+        )
+        if self.checkpoint is not None:
+            self.checkpoint.put(key, digest, summary)
+        self.completed += 1
+        return summary
+
+    def _count_retry(self, error: BaseException):
+        self.retries += 1
+
+    def map(
+        self, items: Iterable[T], request: Callable[[T], Tuple[str, str, dict]]
+    ) -> Iterator[Tuple[T, str]]:
+        """
+        Summarize a stream of items, yielding (item, summary) in input order.
+
+        Args:
+            items: Anything to summarize
+            request: Maps an item to (checkpoint key, content hash, prompt inputs)
+        """
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="summarize"
+        ) as executor:
+            in_flight = deque()
+            try:
+                for item in items:
+                    in_flight.append(
+                        (item, executor.submit(self.summarize, *request(item)))
+                    )
+                    if len(in_flight) >= 2 * self.concurrency:
+                        item, future = in_flight.popleft()
+                        yield item, future.result()
+                while in_flight:
+                    item, future = in_flight.popleft()
+                    yield item, future.result()
+            finally:
+                for _, future in in_flight:
+                    future.cancel()
@@ -0,0 +1,123 @@
+import tempfile
+import numpy as np
+from local_vector_store import LocalVectorStore, matches_filter
+
+DIMENSION = 16
+FILTERS = [
+    {"bill": "sb_1"},
+    {"bill": {"$eq": "sb_1"}},
+    {"bill": {"$in": ["sb_1", "r_2"]}},
+    {"versions": {"$in": ["engrossed"]}},
+    {"versions": "first_reading"},
+    {"bill": {"$in": ["sb_1", "r_2"]}, "versions": {"$in": ["engrossed"]}},
+    {"$and": [{"bill": "r_2"}, {"versions": {"$in": ["first_reading"]}}]},
+    {"bill": {"$in": ["sb_1", "r_2"]}, "clause": {"$gte": 3}},
+    {"bill": {"$nin": ["sb_1"]}, "versions": {"$eq": "officiated"}},
+    {"$or": [{"bill": "fb_3"}, {"clause": {"$lt": 1}}]},
+    {"versions": {"$ne": "first_reading"}},
+    {"bill": {"$in": []}},
+    {"bill": "missing"},
+]
+
+
+def records(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    bills = ["sb_1", "r_2", "fb_3", "gb_4"]
+    versions = ["first_reading", "second_reading", "engrossed", "officiated"]
+    metadatas = []
+    for i in range(count):
+        start = int(rng.integers(len(versions)))
+        metadatas.append(
+            {
+                "bill": bills[i % len(bills)],
+                "versions": versions[start : start + int(rng.integers(1, 3))],
+                "clause": i % 5,
+            }
+        )
+    vectors = rng.normal(size=(count, DIMENSION)).astype(np.float32)
+    return [f"chunk {i}" for i in range(count)], vectors, metadatas
+
+
+def expected_ids(ids, metadatas, filter):
+    return {
+        id for id, metadata in zip(ids, metadatas) if matches_filter(metadata, filter)
+    }
+
+
+def search_ids(store, filter):
+    query = np.ones(DIMENSION, dtype=np.float32)
+    return {
+        doc.id
+        for doc in store.similarity_search_by_vector(query, k=10**6, filter=filter)
+    }
+
+
+def test_list_fields_match_any_element():
+    metadata = {"versions": ["first_reading", "engrossed"]}
+    assert matches_filter(metadata, {"versions": {"$eq": "engrossed"}})
+    assert matches_filter(metadata, {"versions": {"$in": ["officiated", "engrossed"]}})
+    assert not matches_filter(metadata, {"versions": {"$nin": ["engrossed"]}})
+    assert not matches_filter(metadata, {"versions": {"$ne": "first_reading"}})
+
+
+def test_filters_match_a_full_scan():
+    texts, vectors, metadatas = records(200)
+    ids = [f"id-{i}" for i in range(len(texts))]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(tmp, embedding=None)
+        store.add_embeddings(texts, vectors, metadatas, ids)
+        for filter in FILTERS:
+            assert search_ids(store, filter) == expected_ids(
+                ids, metadatas, filter
+            ), filter
+
+        # Postings follow replaced and deleted records
+        for i in range(0, 40, 2):
+            metadatas[i] = {"bill": "sb_1", "versions": ["engrossed"], "clause": 4}
+        store.add_embeddings(texts[:40:2], vectors[:40:2], metadatas[:40:2], ids[:40:2])
+        store.delete(ids[1:40:2])
+        live = ids[:40:2] + ids[40:]
+        kept = metadatas[:40:2] + metadatas[40:]
+        for filter in FILTERS:
+            assert search_ids(store, filter) == expected_ids(live, kept, filter), filter
+
+        # And survive a reload from disk
+        reloaded = LocalVectorStore(tmp, embedding=None)
+        for filter in FILTERS:
+            assert search_ids(reloaded, filter) == expected_ids(
+                live, kept, filter
+            ), filter
+
+
+def test_ivf_recall():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(32, DIMENSION))
+    labels = rng.integers(len(centers), size=4000)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(len(labels), DIMENSION))
+    queries = centers[rng.integers(len(centers), size=50)] + 0.3 * rng.normal(
+        size=(50, DIMENSION)
+    )
+    texts = [f"chunk {i}" for i in range(len(vectors))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(tmp, embedding=None, ivf_min_vectors=10**9, probes=4)
+        store.add_embeddings(texts, vectors, ids=texts)
+        exact = [search_top(store, query) for query in queries]
+
+        store.build_ivf(n_lists=32)
+        approximate = [search_top(store, query) for query in queries]
+
+    found = sum(len(e & a) for e, a in zip(exact, approximate))
+    recall = found / sum(len(e) for e in exact)
+    assert recall >= 0.9, recall
+
+
+def search_top(store, query, k: int = 10):
+    return {doc.id for doc in store.similarity_search_by_vector(query, k=k)}
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
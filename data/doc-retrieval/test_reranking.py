@@ -0,0 +1,114 @@
+import asyncio
+from langchain_core.documents import Document
+from reranking import (
+    DEFAULT_SCORE,
+    LLMListwiseScorer,
+    LLMPointwiseScorer,
+    Reranker,
+    Scorer,
+)
+
+
+class FixedScorer(Scorer):
+    """Scores chunks from a text -> score table, recording what it was asked."""
+
+    def __init__(self, scores: dict, name: str = "fixed"):
+        self.scores = scores
+        self.name = name
+        self.calls = []
+
+    def score(self, query, documents):
+        self.calls.append([doc.page_content for doc in documents])
+        return [self.scores.get(doc.page_content) for doc in documents]
+
+
+class FailingChain:
+    def invoke(self, inputs):
+        raise TimeoutError("no reply")
+
+    async def ainvoke(self, inputs):
+        raise TimeoutError("no reply")
+
+
+def chunks(*texts, **metadata):
+    return [Document(page_content=text, metadata=dict(metadata)) for text in texts]
+
+
+def test_ranks_by_score():
+    reranker = Reranker(FixedScorer({"a": 1.0, "b": 9.0, "c": 5.0}))
+    ranked = reranker.rerank("fees", chunks("a", "b", "c"), k=2)
+    assert [doc.page_content for doc in ranked] == ["b", "c"]
+
+
+def test_cache_key():
+    scorer = FixedScorer({"a": 1.0, "b": 9.0})
+    reranker = Reranker(scorer)
+    reranker.rerank("Student  fees", chunks("a", "b", chunk_id=0), k=2)
+    assert scorer.calls == [["a", "b"]]
+
+    # Normalized query and the same text under other metadata: cached
+    reranker.rerank("  student FEES ", chunks("a", "b", chunk_id=7), k=2)
+    assert len(scorer.calls) == 1
+
+    # Only the new chunk text is scored
+    reranker.rerank("student fees", chunks("a", "b", "c"), k=3)
+    assert scorer.calls[1:] == [["c"]]
+
+    # Another query, or another scorer, scores everything again
+    reranker.rerank("parking", chunks("a", "b"), k=2)
+    assert scorer.calls[2:] == [["a", "b"]]
+    reranker.scorer = FixedScorer({}, name="other")
+    reranker.rerank("student fees", chunks("a", "b"), k=2)
+    assert reranker.scorer.calls == [["a", "b"]]
+
+
+def test_failed_scores_fall_back_uncached():
+    # "b" can't be scored, so it ranks with DEFAULT_SCORE, between a and c
+    scorer = FixedScorer({"a": DEFAULT_SCORE + 1, "c": DEFAULT_SCORE - 1})
+    reranker = Reranker(scorer)
+    ranked = reranker.rerank("fees", chunks("c", "b", "a"), k=3)
+    assert [doc.page_content for doc in ranked] == ["a", "b", "c"]
+
+    reranker.rerank("fees", chunks("c", "b", "a"), k=3)
+    assert scorer.calls == [["c", "b", "a"], ["b"]]
+
+
+def test_failed_listwise_request_falls_back():
+    scorer = LLMListwiseScorer.__new__(LLMListwiseScorer)
+    scorer.chain = FailingChain()
+    documents = chunks("a", "b")
+    assert scorer.score("fees", documents) == [None, None]
+    assert asyncio.run(scorer.ascore("fees", documents)) == [None, None]
+
+    # Nothing was rated, so the vector store's order is kept
+    ranked = Reranker(scorer).rerank("fees", documents, k=2)
+    assert [doc.page_content for doc in ranked] == ["a", "b"]
+
+
+def test_listwise_parsing():
+    reply = "1: 8\n2 - 3\nChunk 3: 9\n7: 10"
+    assert LLMListwiseScorer.parse_ratings(reply, 3) == [8.0, 3.0, 9.0]
+    # Out of range numbers are ignored, missing ones left for the fallback
+    assert LLMListwiseScorer.parse_ratings("2: 6\n9: 1", 3) == [None, 6.0, None]
+    assert LLMListwiseScorer.parse_ratings("I can't rate these.", 2) == [None, None]
+
+
+def test_pointwise_parsing():
+    replies = ["Rating: 7", "10", ValueError("bad request"), "no idea"]
+    assert LLMPointwiseScorer._parse_replies(replies) == [7.0, 10.0, None, None]
+
+
+def test_async_rerank_shares_the_cache():
+    scorer = FixedScorer({"a": 2.0, "b": 4.0})
+    reranker = Reranker(scorer)
+    ranked = asyncio.run(reranker.arerank("fees", chunks("a", "b"), k=1))
+    assert [doc.page_content for doc in ranked] == ["b"]
+    reranker.rerank("fees", chunks("a", "b"), k=1)
+    assert len(scorer.calls) == 1
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import rate_limiting
+from rate_limiting import AdaptiveRateLimiter, RateLimitError
+from summarization import FakeLLM, Summarizer, SummaryCheckpoint
+
+PROMPT = "Summarize: {text}"
+
+# Keep retry backoff in the milliseconds
+rate_limiting.BACKOFF_BASE = 0.001
+
+
+def make_summarizer(llm, checkpoint=None, concurrency=4, max_retries=20):
+    return Summarizer(
+        llm,
+        PROMPT,
+        concurrency=concurrency,
+        limiter=AdaptiveRateLimiter(60_000, 10_000_000),
+        checkpoint=checkpoint,
+        max_retries=max_retries,
+        token_counter=len,
+    )
+
+
+def bills(count):
+    return [f"bill {i} " * (i + 1) for i in range(count)]
+
+
+def request(text):
+    key = text.split()[1]
+    return key, str(hash(text)), {"text": text}
+
+
+def test_retries_rate_limits():
+    llm = FakeLLM(latency=0, rate_limit_probability=0.5, retry_after=0.001, seed=1)
+    summarizer = make_summarizer(llm)
+    texts = bills(20)
+
+    results = list(summarizer.map(texts, request))
+
+    assert [item for item, _ in results] == texts
+    assert all(summary.startswith("Summary of") for _, summary in results)
+    assert llm.rate_limited > 0
+    assert summarizer.retries == llm.rate_limited
+    assert llm.calls == len(texts) + llm.rate_limited
+    assert summarizer.completed == len(texts)
+    # Every 429 halved the rate; 20 successes can't have recovered it all
+    assert summarizer.limiter.scale < 1.0
+
+
+def test_gives_up_after_max_retries():
+    llm = FakeLLM(latency=0, rate_limit_probability=1.0)
+    summarizer = make_summarizer(llm, max_retries=2)
+    try:
+        summarizer.summarize("0", "hash", {"text": "bill 0"})
+    except RateLimitError:
+        pass
+    else:
+        raise AssertionError("expected the 429 to be raised")
+    assert llm.calls == 3
+    assert summarizer.retries == 2
+
+
+def test_resumes_from_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoint.jsonl")
+        texts = bills(5)
+
+        first = make_summarizer(FakeLLM(latency=0), SummaryCheckpoint(path))
+        expected = list(first.map(texts, request))
+        first.checkpoint._file.close()
+
+        llm = FakeLLM(latency=0)
+        second = make_summarizer(llm, SummaryCheckpoint(path))
+        assert list(second.map(texts, request)) == expected
+        assert llm.calls == 0
+        assert second.resumed == len(texts)
+
+        # A bill whose content changed is summarized again
+        key, _, inputs = request(texts[0])
+        second.summarize(key, "new hash", inputs)
+        assert llm.calls == 1
+
+
+def test_resumes_after_crash():
+    class CrashingLLM(FakeLLM):
+        def __call__(self, prompt):
+            if self.calls == 3:
+                raise ValueError("crashed")
+            return super().__call__(prompt)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoint.jsonl")
+        texts = bills(6)
+
+        crashing = make_summarizer(
+            CrashingLLM(latency=0), SummaryCheckpoint(path), concurrency=1
+        )
+        try:
+            list(crashing.map(texts, request))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected the crash to be raised")
+        crashing.checkpoint._file.close()
+        # A crash can also cut the last line short
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"key": "3", "ha')
+
+        checkpoint = SummaryCheckpoint(path)
+        assert len(checkpoint) == 3
+
+        llm = FakeLLM(latency=0)
+        resumed = make_summarizer(llm, checkpoint)
+        results = list(resumed.map(texts, request))
+        assert [item for item, _ in results] == texts
+        assert resumed.resumed == 3
+        assert llm.calls == 3
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from rate_limiting import AdaptiveRateLimiter, call_with_retries, count_tokens
+
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "4"))
+# OpenAI accepts up to 2048 inputs and 300k tokens per embeddings request
+EMBED_BATCH_SIZE = 2048
+EMBED_BATCH_TOKENS = 300_000
+EMBEDDING_RPM = int(os.getenv("EMBEDDING_RPM", "3000"))
+EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", "1000000"))
+# Pinecone accepts up to 1000 vectors and 2MB per upsert request
+UPSERT_MAX_VECTORS = 1000
+UPSERT_MAX_BYTES = 2 * 1024 * 1024
+UPSERT_RPM = int(os.getenv("UPSERT_RPM", "6000"))
+# Seconds documents may wait in the buffer before being written anyway
+UPSERT_FLUSH_INTERVAL = float(os.getenv("UPSERT_FLUSH_INTERVAL", "5"))
+DELETE_BATCH_SIZE = 1000
+REPORT_INTERVAL = 10.0
+
+
+def payload_bytes(text: str, vector: List[float], metadata: dict, id: str) -> int:
+    """Rough size of one vector in an upsert request body."""
+    # Values serialize as JSON floats of up to ~20 characters each
+    return (
+        len(vector) * 20
+        + len(text.encode("utf-8"))
+        + len(json.dumps(metadata))
+        + len(id)
+        + 64
+    )
+
+
+def payload_batches(
+    items: List[Tuple[str, List[float], dict, str]],
+    max_bytes: int = UPSERT_MAX_BYTES,
+    max_vectors: int = UPSERT_MAX_VECTORS,
+) -> Iterator[List[Tuple[str, List[float], dict, str]]]:
+    """Split (text, vector, metadata, id) items into request-sized batches."""
+    batch = []
+    size = 0
+    for item in items:
+        item_size = payload_bytes(*item)
+        if batch and (size + item_size > max_bytes or len(batch) >= max_vectors):
+            yield batch
+            batch = []
+            size = 0
+        batch.append(item)
+        size += item_size
+    if batch:
+        yield batch
+
+
+def write_vectors(
+    vector_store: VectorStore,
+    texts: List[str],
+    vectors: List[List[float]],
+    metadatas: List[dict],
+    ids: List[str],
+):
+    """Write precomputed vectors so the store does not embed the texts again."""
+    if hasattr(vector_store, "add_embeddings"):
+        vector_store.add_embeddings(texts, vectors, metadatas, ids)
+        return
+
+    index = getattr(vector_store, "index", None)
+    text_key = getattr(vector_store, "_text_key", None)
+    if index is not None and text_key is not None:
+        # PineconeVectorStore keeps the page content in the metadata
+        index.upsert(
+            vectors=[
+                (id, vector, {**metadata, text_key: text})
+                for text, vector, metadata, id in zip(texts, vectors, metadatas, ids)
+            ],
+            namespace=getattr(vector_store, "_namespace", None),
+        )
+        return
+
+    vector_store.add_texts(texts, metadatas=metadatas, ids=ids)
+
+
+class UpsertScheduler:
+    """
+    Embeds and writes documents to one vector store, concurrently.
+
+    Documents are buffered until they fill one upsert request, or one
+    embeddings request if that comes first, or have waited `flush_interval`
+    seconds; then a worker embeds them and writes the vectors in upserts
+    sized by payload. The time limit keeps a slow trickle of documents, e.g.
+    one summary per bill, from sitting unwritten until the end of the run.
+    Both kinds of request go through their own adaptive rate limiter and are
+    retried on 429s and transient errors. Retries are safe because every
+    vector has a deterministic ID, so a repeated upsert just overwrites it.
+
+    `indexed` only counts documents whose earlier documents have all been
+    written too, so callers can treat everything before it as durable.
+    """
+
+    def __init__(
+        self,
+        get_vector_store: Callable[[], VectorStore],
+        get_embedding: Callable[[], Embeddings],
+        label: str,
+        concurrency: int = UPSERT_CONCURRENCY,
+        embed_batch_size: int = UPSERT_MAX_VECTORS,
+        embed_batch_tokens: int = EMBED_BATCH_TOKENS,
+        flush_interval: float = UPSERT_FLUSH_INTERVAL,
+        embed_limiter: AdaptiveRateLimiter = None,
+        upsert_limiter: AdaptiveRateLimiter = None,
+        token_counter: Callable[[str], int] = None,
+    ):
+        self.get_vector_store = get_vector_store
+        self.get_embedding = get_embedding
+        self.label = label
+        self.concurrency = concurrency
+        self.embed_batch_size = min(embed_batch_size, EMBED_BATCH_SIZE)
+        self.embed_batch_tokens = embed_batch_tokens
+        self.flush_interval = flush_interval
+        self.embed_limiter = embed_limiter or AdaptiveRateLimiter(
+            EMBEDDING_RPM, EMBEDDING_TPM
+        )
+        self.upsert_limiter = upsert_limiter or AdaptiveRateLimiter(UPSERT_RPM)
+        self.token_counter = token_counter or (
+            lambda text: count_tokens(text, "text-embedding-3-small")
+        )
+
+        self._docs: List[Document] = []
+        self._ids: List[str] = []
+        self._tokens = 0
+        # When the oldest buffered document was added
+        self._buffered_since = 0.0
+        self._executor = None
+        self._in_flight: deque = deque()
+        self._lock = threading.Lock()
+        # start offset -> end offset of written batches not yet contiguous
+        self._done: Dict[int, int] = {}
+        self._submitted = 0
+
+        self.added = 0
+        self.indexed = 0
+        self.deleted = 0
+        self.embed_requests = 0
+        self.upsert_requests = 0
+        self.retries = 0
+        self._started = None
+        self._last_report = 0.0
+
+    def add(
+        self, docs: List[Document], ids: List[str], tokens: Optional[List[int]] = None
+    ):
+        """
+        Queue documents for writing. Pass `tokens` when the token counts are
+        already known, to skip counting them again.
+        """
+        if tokens is None:
+            tokens = [self.token_counter(doc.page_content) for doc in docs]
+        for doc, id, doc_tokens in zip(docs, ids, tokens):
+            if self._docs and (
+                len(self._docs) >= self.embed_batch_size
+                or self._tokens + doc_tokens > self.embed_batch_tokens
+            ):
+                self._submit()
+            if not self._docs:
+                self._buffered_since = time.monotonic()
+            self._docs.append(doc)
+            self._ids.append(id)
+            self._tokens += doc_tokens
+        self.added += len(docs)
+        if (
+            self._docs
+            and time.monotonic() - self._buffered_since >= self.flush_interval
+        ):
+            self._submit()
+        self._reap()
+
+    def flush(self):
+        """Write everything buffered and wait for all in-flight work."""
+        if self._docs:
+            self._submit()
+        while self._in_flight:
+            self._in_flight.popleft().result()
+        self.report()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def delete(self, ids: List[str]):
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch = ids[i : i + DELETE_BATCH_SIZE]
+            call_with_retries(
+                lambda: self.get_vector_store().delete(ids=batch),
+                self.upsert_limiter,
+                on_retry=self._count_retry,
+            )
+            self.deleted += len(batch)
+
+    def _submit(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix=f"upsert-{self.label}"
+            )
+            self._started = time.monotonic()
+            self._last_report = self._started
+
+        start = self._submitted
+        docs, ids, tokens = self._docs, self._ids, self._tokens
+        self._docs, self._ids, self._tokens = [], [], 0
+        self._submitted += len(docs)
+
+        # Bound the work in flight; this also surfaces worker errors early
+        while len(self._in_flight) >= 2 * self.concurrency:
+            self._in_flight.popleft().result()
+        self._in_flight.append(
+            self._executor.submit(self._write, start, docs, ids, tokens)
+        )
+
+    def _reap(self):
+        while self._in_flight and self._in_flight[0].done():
+            self._in_flight.popleft().result()
+
+    def _write(self, start: int, docs: List[Document], ids: List[str], tokens: int):
+        texts = [doc.page_content for doc in docs]
+        metadatas = [dict(doc.metadata) for doc in docs]
+
+        vectors = call_with_retries(
+            lambda: self.get_embedding().embed_documents(texts),
+            self.embed_limiter,
+            tokens,
+            on_retry=self._count_retry,
+        )
+        with self._lock:
+            self.embed_requests += 1
+
+        vector_store = self.get_vector_store()
+        for batch in payload_batches(list(zip(texts, vectors, metadatas, ids))):
+            batch_texts, batch_vectors, batch_metadatas, batch_ids = map(
+                list, zip(*batch)
+            )
+            call_with_retries(
+                lambda: write_vectors(
+                    vector_store, batch_texts, batch_vectors, batch_metadatas, batch_ids
+                ),
+                self.upsert_limiter,
+                on_retry=self._count_retry,
+            )
+            with self._lock:
+                self.upsert_requests += 1
+
+        with self._lock:
+            self._done[start] = start + len(docs)
+            while self.indexed in self._done:
+                self.indexed = self._done.pop(self.indexed)
+            report = time.monotonic() - self._last_report >= REPORT_INTERVAL
+        if report:
+            self.report()
+
+    def _count_retry(self, error: BaseException):
+        with self._lock:
+            self.retries += 1
+
+    def report(self):
+        if self._started is None:
+            return
+        self._last_report = time.monotonic()
+        elapsed = max(self._last_report - self._started, 1e-9)
+        print(
+            f"Indexed {self.indexed} {self.label} in {elapsed:.1f}s "
+            f"({self.indexed / elapsed:.1f}/s, {self.embed_requests} embedding requests, "
+            f"{self.upsert_requests} upserts, {self.retries} retries, "
+            f"rate scale {min(self.embed_limiter.scale, self.upsert_limiter.scale):.2f})"
+        )
@@ -0,0 +1,35 @@
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def run_warmup(steps: List[Tuple[str, Callable[[], Any]]]) -> Dict[str, Any]:
+    """
+    Run startup steps in order, timing each one.
+
+    A failing step is recorded and skipped rather than raised; everything it
+    would have prepared is created lazily on first use instead.
+
+    Returns:
+        A report with per-step durations in milliseconds and any errors
+    """
+    started = time.perf_counter()
+    report = {"steps": [], "errors": {}}
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            report["errors"][name] = str(e)
+        elapsed_ms = (time.perf_counter() - step_started) * 1000
+        report["steps"].append({"name": name, "ms": round(elapsed_ms, 1)})
+    report["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"Warm-up finished in {report['total_ms']:.1f} ms"]
+    for step in report["steps"]:
+        error = report["errors"].get(step["name"])
+        status = f"FAILED: {error}" if error else "ok"
+        lines.append(f"  {step['name']:<24} {step['ms']:>9.1f} ms  {status}")
+    return "\n".join(lines)